@@ -2,19 +2,18 @@
 
 import os,sys,time
 from DIRAC.Core.Base import Script
-Script.initialize()
 
 from DIRAC.Core.Utilities.ReturnValues import returnSingleResult
 
-from DIRAC.DataManagementSystem.Client.FileCatalogClientCLI import FileCatalogClientCLI
 from DIRAC.Resources.Catalog.FileCatalogClient import FileCatalogClient
 from DIRAC.Core.Security.ProxyInfo import getProxyInfo
 
-from DIRAC.Interfaces.API.Dirac import Dirac
 from DIRAC import gLogger,S_OK,S_ERROR
 
-from IHEPDIRAC.Badger.DataLoader.DFC.readAttributes import DataAll,Others
-from IHEPDIRAC.Badger.DataLoader.DFC.judgeType import judgeType
+# FileCatalogClientCLI, the Dirac API and the DFC DataLoader are slow to
+# import and only a few methods need them, so they are imported in those
+# methods. Keep it that way: the besdirac-* scripts import this module on
+# every call, see Test/benchmarkStartup.py
 """This is the public API for BADGER, the BESIII Advanced Data ManaGER.
 
    BADGER wraps the DIRAC File Catalog and related DIRAC methods for 
@@ -28,6 +27,10 @@ class Badger:
     def __init__(self, fcClient = False):
         """Internal initialization of Badger API.
         """       
+        # DIRAC is initialized here and not at import, so importing the API
+        # does not parse sys.argv. The scripts parse their command line
+        # before, then it does nothing.
+        Script.initialize()
         if not fcClient:
             _fcType = 'DataManagement/FileCatalog'
             self.client = FileCatalogClient(_fcType)
@@ -76,6 +79,8 @@ class Badger:
     def __getFileAttributes(self,fullPath):
         """ get all attributes of the given file,return a attribute dict.
         """
+        from IHEPDIRAC.Badger.DataLoader.DFC.readAttributes import DataAll,Others
+        from IHEPDIRAC.Badger.DataLoader.DFC.judgeType import judgeType
         if os.path.exists(fullPath):
           type = judgeType(fullPath)
           if type=="all":
@@ -479,6 +484,15 @@ class Badger:
           retVal = {} 
         return retVal 
 
+    def getSizeAndChecksum(self,lfns):
+        """get {lfn:(size,checksum)} of the given lfns"""
+        retVal = {}
+        result = self.client.getFileMetadata(lfns)
+        if result['OK']:
+          for lfn,meta in result['Value']['Successful'].items():
+            retVal[lfn] = (meta.get('Size'),meta.get('Checksum'))
+        return retVal
+
     def getFilesByMetadataQuery(self, query):
         """Return a list of LFNs satisfying given query conditions.
 
@@ -494,6 +508,7 @@ class Badger:
         #TODO: calling the FileCatalog CLI object and its private method
         # is not a good way of doing this! but use it to allow construction of
         # the query meantime, until createQuery is made a public method
+        from DIRAC.DataManagementSystem.Client.FileCatalogClientCLI import FileCatalogClientCLI
         cli = FileCatalogClientCLI(fc)
         metadataDict = cli._FileCatalogClientCLI__createQuery(query)
         result = fc.findFilesByMetadata(metadataDict,'/')
@@ -513,6 +528,7 @@ class Badger:
         we can treat localDir as a kind of datasetName.
         """          
 
+        from DIRAC.Interfaces.API.Dirac import Dirac
         result_OK = 1
         errorList = []
         #fileList = self.getFilenamesByLocaldir(localDir)
@@ -563,6 +579,7 @@ class Badger:
            Example usage:
            >>>badger.downloadFilesByFilelist(fileList)
         """
+        from DIRAC.Interfaces.API.Dirac import Dirac
         errorDict = {}
         dirac = Dirac()
         #fileList = self.getFilesByDatasetName(dataset_name)
@@ -589,6 +606,7 @@ class Badger:
            type(conditions) is str,like "resonance=jpsi bossVer=655 round=round1"
         """
         fc = self.client
+        from DIRAC.DataManagementSystem.Client.FileCatalogClientCLI import FileCatalogClientCLI
         cli = FileCatalogClientCLI(fc)
         metadataDict = cli._FileCatalogClientCLI__createQuery(conditions)
         metadataDict['Path'] = path 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+"""Compare two file listings, e.g. a DFC directory and a local directory.
+
+   Each listing is turned into an index {relative path: (size, checksum)},
+   or {file name: (size, checksum)} to compare a flat listing with a tree,
+   so every lookup is a hash lookup and the whole comparison is linear in
+   the number of files.
+"""
+
+import os
+
+
+def relativePath(path, baseDir):
+  """path relative to baseDir, baseDir may or may not end with '/'"""
+  baseDir = baseDir.rstrip('/') + '/'
+  if path.startswith(baseDir):
+    return path[len(baseDir):]
+  return path
+
+
+def buildIndex(entries, baseDir='', basename=False, duplicates=None):
+  """build {relative path: (size, checksum)} from (path, size, checksum) entries.
+     with basename, the keys are the file names instead.
+     checksum may be None if it is unknown.
+     if two entries have the same key, the first one is kept and the
+     path of the other one is appended to the list duplicates, if given
+  """
+  index = {}
+  for fullPath, size, checksum in entries:
+    path = fullPath
+    if basename:
+      path = os.path.basename(path)
+    elif baseDir:
+      path = relativePath(path, baseDir)
+    if path in index:
+      if duplicates is not None:
+        duplicates.append(fullPath)
+      continue
+    index[path] = (size, checksum)
+  return index
+
+
+def localEntries(localDir, withChecksum=False):
+  """yield (path, size, checksum) of all files under localDir.
+     checksum is the adler32 of the file if withChecksum, None otherwise
+  """
+  if withChecksum:
+    from DIRAC.Core.Utilities.Adler import fileAdler
+  for rootdir, subdirs, files in os.walk(localDir):
+    for name in files:
+      fullPath = os.path.join(rootdir, name)
+      checksum = None
+      if withChecksum:
+        checksum = fileAdler(fullPath)
+      yield fullPath, os.path.getsize(fullPath), checksum
+
+
+def _sameChecksum(a, b):
+  """adler32 strings may differ in case and leading zeros"""
+  if a is None or b is None:
+    return True
+  return a.lower().lstrip('0') == b.lower().lstrip('0')
+
+
+def compareIndexes(srcIndex, dstIndex, failed=()):
+  """compare two indexes built by buildIndex.
+     failed are the paths of the source which could not be read,
+     they are not in srcIndex.
+     return a dict with sorted lists:
+       missing:    paths in srcIndex but not in dstIndex
+       extra:      paths in dstIndex but not in srcIndex nor in failed
+       mismatched: (path, (srcSize, srcChecksum), (dstSize, dstChecksum))
+                   for paths whose size or checksum differ
+       failed:     the paths of failed, they are not compared
+     a checksum of None is not compared
+  """
+  missing = []
+  mismatched = []
+  for path, src in srcIndex.iteritems():
+    dst = dstIndex.get(path)
+    if dst is None:
+      missing.append(path)
+    elif src[0] != dst[0] or not _sameChecksum(src[1], dst[1]):
+      mismatched.append((path, src, dst))
+  failed = set(failed)
+  extra = [path for path in dstIndex
+           if path not in srcIndex and path not in failed]
+
+  missing.sort()
+  extra.sort()
+  mismatched.sort()
+  return {'missing': missing, 'extra': extra, 'mismatched': mismatched,
+          'failed': sorted(failed)}
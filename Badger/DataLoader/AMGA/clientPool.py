@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+###############################################################################
+# Keep authenticated connections to the AMGA mdserver open and reuse them     #
+# instead of connecting to badger01:8822 again for every operation.           #
+#                                                                             #
+#   def listDir(client,dir):                                                  #
+#       client.listEntries(dir)                                               #
+#       ...                                                                   #
+#   gClientPool.execute(listDir,dir)                                          #
+#                                                                             #
+# A client must be released before another caller gets it, because results   #
+# of listEntries/getattr are read back from the same connection. After an    #
+# exception the state of the connection is unknown, so it is not reused.     #
+###############################################################################
+
+from amga import mdclient,mdinterface
+
+HOST = 'badger01.ihep.ac.cn'
+PORT = 8822
+LOGIN = 'amga'
+PASSWORD = 'Amg@Us3r'
+
+#number of entries sent by one addEntries call
+BULK_SIZE = 500
+
+
+class MDClientPool(object):
+    def __init__(self,host=HOST,port=PORT,login=LOGIN,password=PASSWORD,maxIdle=4):
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        #max number of idle connections kept open
+        self.maxIdle = maxIdle
+        self.idle = []
+
+    #get an idle connection,or open a new one if there is none
+    def getClient(self):
+        if self.idle:
+            return self.idle.pop()
+        return mdclient.MDClient(self.host,self.port,self.login,self.password)
+
+    #give a connection back to the pool
+    #a broken connection is not kept,it is closed when it is garbage collected
+    def releaseClient(self,client,broken=False):
+        if not broken and len(self.idle) < self.maxIdle:
+            self.idle.append(client)
+
+    #drop all idle connections
+    def close(self):
+        self.idle = []
+
+    #run function(client,*args) on a pooled connection
+    #a connection on which function raised is dropped: the socket may be dead
+    #or results may be left unread on it
+    def execute(self,function,*args):
+        client = self.getClient()
+        try:
+            result = function(client,*args)
+        except:
+            self.releaseClient(client,broken=True)
+            raise
+        self.releaseClient(client)
+        return result
+
+    #insert many entries which share the same attribute keys
+    #entries is a list of (entryName,values)
+    #if mdclient supports addEntries,entries are sent BULK_SIZE at a time,
+    #otherwise they are added one by one over the same connection
+    #return list of (entryName,error) for entries which failed
+    def addEntries(self,keys,entries):
+        return self.execute(_addEntries,keys,entries)
+
+
+def _addEntries(client,keys,entries):
+    errors = []
+    if hasattr(client,'addEntries'):
+        for i in range(0,len(entries),BULK_SIZE):
+            chunk = entries[i:i+BULK_SIZE]
+            try:
+                client.addEntries([name for name,values in chunk],keys,[values for name,values in chunk])
+            except mdinterface.CommandException,ex:
+                #retry this chunk one by one to find out which entry failed
+                errors.extend(_addEntriesOneByOne(client,keys,chunk))
+    else:
+        errors.extend(_addEntriesOneByOne(client,keys,entries))
+    return errors
+
+
+def _addEntriesOneByOne(client,keys,entries):
+    errors = []
+    for name,values in entries:
+        try:
+            client.addEntry(name,keys,values)
+        except mdinterface.CommandException,ex:
+            errors.append((name,ex))
+    return errors
+
+
+gClientPool = MDClientPool()
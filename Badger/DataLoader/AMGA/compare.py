@@ -3,6 +3,12 @@
 # author: linlei
 from amga import mdclient,mdinterface
 from insertToCatalogue import getEventType,getExpNum
+from clientPool import gClientPool
+
+#get the attributes of entry which are compared
+def _getattr(client,entry):
+    client.getattr(entry,['resonance','streamId','eventType','bossVer','expNum'])
+    return client.getEntry()[1]
 
 def compare(attributes,input):
     list = {}
@@ -24,10 +30,7 @@ def compare(attributes,input):
 
     entry=dir+"/"+attributes["LFN"]
 
-    client=mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')
-
-    client.getattr(entry,['resonance','streamId','eventType','bossVer','expNum'])
-    result = client.getEntry()[1]
+    result = gClientPool.execute(_getattr,entry)
     inamga["resonance"] = result[0]
     inamga["streamId"] = result[1]
     inamga["eventType"] = result[2]
@@ -21,12 +21,14 @@ parser.add_option('--expNum',dest='expNum',help='If you want to check experiment
 parser.add_option('--bossVer',dest='bossVer',help='If you want to check boss version attribute,please input its value')
 parser.add_option('--eventType',dest='eventType',help='If you want to check event type attribute,please input its value')
 parser.add_option('--streamId',dest='streamId',help='If you want to check streamid attribute,please input its value')
+parser.add_option('-b',dest='batchsize',default='100',help='how many files are inserted into amga at once')
 
 (options,args) = parser.parse_args()
 linefrm = string.atoi(options.linefrm)
 lineto = string.atoi(options.lineto)
 dstfiles = options.dstfiles
 rootfile = options.rootfile
+batchsize = string.atoi(options.batchsize)
 
 checkattributes = {}
 if options.resonance is not None:
@@ -44,13 +46,15 @@ if options.streamId is not None:
 #print "rootfile:",rootfile
  
 from readAttributes import DataAll,Others
-from insertToCatalogue import insert
+from insertToCatalogue import insertEntries
 from judgeType import judgeType
 from compare import compare
 
 totaltime = 0
 #store number of files which have been uploaded or checked
 linenum = linefrm
+#attributes of files waiting to be inserted into amga
+batch = []
 
 start = time.time()
 if os.path.exists(dstfiles):
@@ -93,8 +97,10 @@ if os.path.exists(dstfiles):
                 #print attributes
                 
                 if len(checkattributes)==0:
-                    insert(attributes)
-                    #print "insert"
+                    batch.append(attributes)
+                    if len(batch)>=batchsize:
+                        insertEntries(batch)
+                        batch = []
                 else:
                     errorlist = compare(attributes,checkattributes)
                     if len(errorlist)!=0:
@@ -103,8 +109,11 @@ if os.path.exists(dstfiles):
                         for key in errorlist.keys():
                             print "%s     in amga:%s     input:%s"%(key,errorlist[key],checkattributes[key])
 
-            
-                
+
+    #insert files left in the last batch
+    if batch:
+        insertEntries(batch)
+
 end = time.time()
 totaltime = end - start
 num = linenum - linefrm
@@ -13,6 +13,7 @@
 ###############################################################################
 
 from amga import mdclient,mdinterface
+from clientPool import gClientPool
 
         
 def createFileDir(client,resonance,bossVer,type):
@@ -65,7 +66,7 @@ def createEventTypeList(client):
 
 
 if __name__=="__main__":
-   client=mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')
+   client=gClientPool.getClient()
    resonance=["jpsi","psip","psipp","psi4040","con3650","psippscan"]
    bossVer=["6.5.5","6.6.1"]
    type=["data","mc"]
@@ -3,6 +3,7 @@
 # author: linlei
 
 from amga import mdclient,mdinterface
+from clientPool import gClientPool
 import time
 import re
 
@@ -145,12 +146,10 @@ def createCatalog(client,dir,eventType,expNum,streamId):
         return dir_streamId
 
     
-def insert(attributes):
-    values = []
-    keys = []
-                  
+#get the directory in amga where a file with these attributes is stored
+def getInsertDir(attributes):
     dir1 = "/BES3_test/File/"+attributes["resonance"]+"/"+attributes["bossVer"]
-    
+
     #get real eventType and expNum in catalogue in amga
     eventType = getEventType(attributes["eventType"])
     expNum = getExpNum(attributes["expNum"])
@@ -160,23 +159,65 @@ def insert(attributes):
     else:
         dir=dir1+"/mc"
 
-    client=mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')   
-    #client=mdclient.MDClient('besdev01.ihep.ac.cn',8822,'root')   
-  
-    #get insertion directory in amga
-    insertDir = createCatalog(client,dir,eventType,expNum,attributes["streamId"])
-    
-    #LFN is directory + filename in amga
-    entry=insertDir+"/"+attributes["LFN"]
-    attributes["LFN"] = entry
-    
-    for key in attributes.keys():
-        keys.append(key)
-        values.append(attributes[key])
+    return dir,eventType,expNum
 
-    try:
-        #insert dst file to amga
-        client.addEntry(entry,keys,values)
-    except mdinterface.CommandException,ex:
-        print "Error",ex
 
+def insert(attributes):
+    values = []
+    keys = []
+
+    dir,eventType,expNum = getInsertDir(attributes)
+
+    def _insert(client):
+        #get insertion directory in amga
+        insertDir = createCatalog(client,dir,eventType,expNum,attributes["streamId"])
+
+        #LFN is directory + filename in amga
+        entry=insertDir+"/"+attributes["LFN"]
+        attributes["LFN"] = entry
+
+        for key in attributes.keys():
+            keys.append(key)
+            values.append(attributes[key])
+
+        try:
+            #insert dst file to amga
+            client.addEntry(entry,keys,values)
+        except mdinterface.CommandException,ex:
+            print "Error",ex
+
+    gClientPool.execute(_insert)
+
+
+#insert attributes of many files at once
+#files going to the same directory are sent together by gClientPool.addEntries,
+#and createCatalog is only called once for each directory
+#return number of files which have been inserted
+def insertEntries(attributesList):
+    groups = {}
+    insertDirs = {}
+    inserted = 0
+
+    def _createCatalogs(client):
+        for attributes in attributesList:
+            dir,eventType,expNum = getInsertDir(attributes)
+            catalog = (dir,eventType,expNum,attributes["streamId"])
+            if catalog not in insertDirs:
+                insertDirs[catalog] = createCatalog(client,dir,eventType,expNum,attributes["streamId"])
+
+            #LFN is directory + filename in amga
+            entry=insertDirs[catalog]+"/"+attributes["LFN"]
+            attributes["LFN"] = entry
+
+            keys = tuple(sorted(attributes.keys()))
+            groups.setdefault(keys,[]).append((entry,[attributes[key] for key in keys]))
+
+    gClientPool.execute(_createCatalogs)
+
+    for keys,entries in groups.items():
+        errors = gClientPool.addEntries(list(keys),entries)
+        for entry,ex in errors:
+            print "Error",entry,ex
+        inserted = inserted + len(entries) - len(errors)
+
+    return inserted
@@ -12,9 +12,11 @@ import os.path
 import ROOT
 from ROOT import gROOT
 from amga import mdclient,mdinterface
+from clientPool import gClientPool
 import string
 import re
 import time
+import bisect
 
 #get number behiend string "exp"
 def getNum(expNum):
@@ -24,51 +26,101 @@ def getNum(expNum):
     if res is not None:
         return res.group()      
     
+#experiment ranges of ExpSearch sorted by runFrm, loaded once per process
+#each item is (runFrm,runTo,expNum,resonance)
+_expRanges = None
+#runFrm of each range, used by bisect
+_expRunFrms = []
+#_expMaxRunTos[i] is the biggest runTo of _expRanges[0..i],
+#it tells when we can stop looking backwards for overlapping ranges
+_expMaxRunTos = []
+
+#(re)load all ranges under "/BES3/ExpSearch" into the sorted index
+#call it again after entries in ExpSearch have been added or changed
+def refreshExpSearch():
+    entries = []
+    ranges = []
+
+    def _readExpSearch(client):
+        #get all entries under catalog "/BES3/ExpSearch"
+        client.listEntries('/BES3_test/ExpSearch')
+
+        entry = client.getEntry()[0]
+        while entry:
+             entries.append(entry)
+             entry = client.getEntry()[0]
+
+        for item in entries:
+            #for each entry,get its attributes in amga
+            client.getattr(item,['Id','runFrm','runTo','expNum','resonance'])
+            result = client.getEntry()[1]
+
+            runfrm = string.atoi(result[1])
+            runto = string.atoi(result[2])
+            ranges.append((runfrm,runto,result[3],result[4]))
+
+    gClientPool.execute(_readExpSearch)
+    return loadExpRanges(ranges)
+
+#build the sorted index from ranges, a list of (runFrm,runTo,expNum,resonance)
+def loadExpRanges(ranges):
+    global _expRanges,_expRunFrms,_expMaxRunTos
+    ranges = sorted(ranges)
+    maxRunTos = []
+    maxRunTo = None
+    for r in ranges:
+        if maxRunTo is None or r[1] > maxRunTo:
+            maxRunTo = r[1]
+        maxRunTos.append(maxRunTo)
+
+    _expRanges = ranges
+    _expRunFrms = [r[0] for r in ranges]
+    _expMaxRunTos = maxRunTos
+    return len(ranges)
+
+#return all ranges of ExpSearch which contain runid
+def findExpRanges(runid):
+    if _expRanges is None:
+        refreshExpSearch()
+
+    found = []
+    #ranges before i all have runFrm<=runid
+    i = bisect.bisect_right(_expRunFrms,runid) - 1
+    while i >= 0 and _expMaxRunTos[i] >= runid:
+        if _expRanges[i][1] >= runid:
+            found.append(_expRanges[i])
+        i = i - 1
+    #keep ranges in runFrm order
+    found.reverse()
+    return found
+
 #Get expNum and resonance from ExpSearch according runids
 def getExpRes(runids):
-    entries = []
     expRes = {}
     expNumList = []
     resList = []
-    
+
     #print"runids",runids
-    client = mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')
-    #client = mdclient.MDClient('besdev01.ihep.ac.cn',8822,'root')
-    #get all entries under catalog "/BES3/ExpSearch"
-    client.listEntries('/BES3_test/ExpSearch')
-   
-    entry = client.getEntry()[0]
-    while entry:
-         entries.append(entry)
-         entry = client.getEntry()[0]
-         
-    if entries is None:
+    if _expRanges is None:
+        refreshExpSearch()
+
+    if not _expRanges:
         print "ExpSearch directory is empty, please run createBesDir first"
-        return Flase
-
-    for item in entries:
-        #for each entry,get its attributes in amga
-        client.getattr(item,['Id','runFrm','runTo','expNum','resonance'])
-        result = client.getEntry()[1]
-        # print item
-       # print result
-        
-        runfrm = string.atoi(result[1])
-        runto = string.atoi(result[2])
-    
-        for runid in runids:
-            #check all runid whether between runfrm and runto of each entry 
-            #under catalog "/BES3/ExpSearch"
-            if runfrm<=runid<=runto:
-                #if this runid between runfrm and runto,and expNum isn't in expNumList
-                #add this expNum to expNumList
-                if result[3] not in expNumList:
-                    expNumList.append(result[3])
-
-                #resonance of this id isn't in resonance List,add it to resList
-                if result[4] not in resList:
-                    resList.append(result[4])
-                    
+        return False
+
+    for runid in runids:
+        #check all runid whether between runfrm and runto of each entry
+        #under catalog "/BES3/ExpSearch"
+        for runfrm,runto,expNum,resonance in findExpRanges(runid):
+            #if this runid between runfrm and runto,and expNum isn't in expNumList
+            #add this expNum to expNumList
+            if expNum not in expNumList:
+                expNumList.append(expNum)
+
+            #resonance of this id isn't in resonance List,add it to resList
+            if resonance not in resList:
+                resList.append(resonance)
+
     #only including one resonance
     if len(resList) == 1:
         expRes["resonance"] = resList[0]
@@ -82,7 +134,8 @@ def getExpRes(runids):
         expRes["expNum"] = expNumList[0]
     else:
         #if including several expNums,combine these expNum into mexpN1pN2p...
-        sorted(expNumList)
+        #sorted by number, so the name does not depend on the order of the runids
+        expNumList.sort(key=lambda expNum:(int(getNum(expNum) or -1),expNum))
         str = "m" + expNumList[0]
         for expNum in expNumList[1:]:
             str = str + "p+" + getNum(expNum)
@@ -95,25 +148,25 @@ def getExpRes(runids):
 def eventTypeCheck(eventType):
     entries = []
     
-    client = mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')
-    #client = mdclient.MDClient('besdev01.ihep.ac.cn',8822,'root')
-    client.listEntries('/BES3_test/EventTypeList')
+    def _check(client):
+        client.listEntries('/BES3_test/EventTypeList')
 
-    entry = client.getEntry()[0]
-    while entry:
-        entries.append(entry)
         entry = client.getEntry()[0]
+        while entry:
+            entries.append(entry)
+            entry = client.getEntry()[0]
+
+        for entry in entries:
+            #get name of each entry
+            client.getattr(entry,['FILE'])
+            result = client.getEntry()[1]
+
+            #compare eventType with name of each entry
+            if eventType == result[0]:
+                return True
+        return False
 
-    for entry in entries:
-        #get name of each entry
-        client.getattr(entry,['FILE'])
-        result = client.getEntry()[1]
-
-        #compare eventType with name of each entry
-        if eventType == result[0]:
-            return True
-        
-    return False
+    return gClientPool.execute(_check)
     
     
 #judge format of file
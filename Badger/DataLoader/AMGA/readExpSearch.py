@@ -16,13 +16,12 @@
 from amga import mdclient,mdinterface
 import string
 import uuid
+from clientPool import gClientPool
 
 def insertToExp(items):
     #items is a list,and contains values of 
     #'runFrm','runTo','dateFrm','dateTo','expNum','resonance','roundId'
     
-    client=mdclient.MDClient('badger01.ihep.ac.cn',8822,'amga','Amg@Us3r')
-    
     keys=['Id','runFrm','runTo','dateFrm','dateTo','expNum','resonance','roundId']
     
     #In items, the types of runFrm and runTo are str
@@ -37,10 +36,13 @@ def insertToExp(items):
 
     #set entry name is resonance+"_"+expnum
     entryName='/BES3/ExpSearch/'+resonance+"_"+expnum
-    try:
-        client.addEntry(entryName,keys,values)
-    except mdinterface.CommandException,ex:
-        print "Error",ex
+    def _addEntry(client):
+        try:
+            client.addEntry(entryName,keys,values)
+        except mdinterface.CommandException,ex:
+            print "Error",ex
+
+    gClientPool.execute(_addEntry)
         
     
     
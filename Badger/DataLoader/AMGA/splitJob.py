@@ -8,6 +8,7 @@ from optparse import OptionParser,OptionGroup
 import os
 import os.path
 import time
+import bisect
 
 #input directories of dst file,we can use getAllFiles to get all dst files underthese directories 
 def getAllFiles(dstdir):
@@ -124,6 +125,66 @@ def splitJob_job(linenum,jobnum,flag,dst,attributes):
 
         createSubScript(linefrm,lineto,flag,dst,eachjob,attributes)
 
+#get cost of each dst file listed in dstfile,cost of a file is its size in bytes
+#a file which doesn't exist costs nothing,control.py will skip it
+def getFileCosts(dstfile):
+    costs = []
+    f = open(dstfile,"r")
+    for eachLine in f:
+        file = eachLine.strip()
+        if os.path.exists(file):
+            costs.append(os.path.getsize(file))
+        else:
+            costs.append(0)
+    f.close()
+    return costs
+
+#get line ranges which split costs into jobnum parts with nearly same total cost
+#each sub-job still handles continuous lines,so it can be passed by -f and -o
+def getBalancedRanges(costs,jobnum):
+    linenum = len(costs)
+    if jobnum > linenum:
+        jobnum = linenum
+
+    #cumulative[i] is total cost of lines [0,i)
+    cumulative = [0]
+    for cost in costs:
+        cumulative.append(cumulative[-1] + cost)
+    total = cumulative[-1]
+
+    ranges = []
+    linefrm = 0
+    for eachjob in range(1,jobnum):
+        target = total * eachjob / float(jobnum)
+        lineto = bisect.bisect_left(cumulative,target)
+        #cut at whichever line is nearer to the target
+        if lineto > 0 and target - cumulative[lineto-1] < cumulative[min(lineto,linenum)] - target:
+            lineto = lineto - 1
+        #every sub-job handles at least one line
+        lineto = max(lineto,linefrm + 1)
+        lineto = min(lineto,linenum - (jobnum - eachjob))
+        ranges.append((linefrm,lineto))
+        linefrm = lineto
+    if jobnum > 0:
+        ranges.append((linefrm,linenum))
+    return ranges
+
+#split job into jobnum sub-jobs whose dst files have nearly same total size
+def splitJob_size(jobnum,flag,dst,attributes):
+    if flag == "dir":
+        dstfile = dst + ".files"
+    else:
+        dstfile = dst
+
+    costs = getFileCosts(dstfile)
+    ranges = getBalancedRanges(costs,jobnum)
+
+    num = 0
+    for linefrm,lineto in ranges:
+        print "subJob %d: line %d-%d, size %d"%(num,linefrm,lineto,sum(costs[linefrm:lineto]))
+        createSubScript(linefrm,lineto,flag,dst,num,attributes)
+        num += 1
+
 if __name__ =="__main__":
 
     #parser =ArgumentParser()
@@ -153,6 +214,7 @@ if __name__ =="__main__":
 
     group2.add_option('--filenum',dest='filenum', type=int,help='how many dst files of a small job')
     group2.add_option('--jobnum',dest='jobnum', type=int,help='a big job will be splited into how many small jobs')
+    group2.add_option('--balance',dest='balance',action='store_true',default=False,help='with --jobnum, give every small job nearly same total size of dst files instead of same number of files')
 
     parser.add_option('--res',dest='resonance',help='If you want to check resonance attribute,please input its value')
     parser.add_option('--expnum',dest='expnum',help='If you want to check experiment number attribute,please input its value')
@@ -238,4 +300,7 @@ if __name__ =="__main__":
         if jobnum>15:
             print "Too many small jobs"
             exit()
-        splitJob_job(linenum,jobnum,flag,dst,attributes)
+        if options.balance:
+            splitJob_size(jobnum,flag,dst,attributes)
+        else:
+            splitJob_job(linenum,jobnum,flag,dst,attributes)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Benchmark the comparison engine of besdirac-dms-check-files
+   on a synthetic listing.
+   Usage :
+    python benchmarkCheckFiles.py [nFiles]
+"""
+import sys
+import time
+from IHEPDIRAC.Badger.API.checkFiles import buildIndex,compareIndexes
+
+nFiles = 1000000
+if len(sys.argv)>1:
+  nFiles = int(sys.argv[1])
+
+dfcDir = '/bes/File/jpsi/6.6.1/data/all/exp1'
+localDir = '/bes3fs/offline/data/661-1/jpsi/dst'
+
+def dfcListing():
+  for i in xrange(nFiles):
+    yield '%s/run_%07d_All_file001_SFO-1.dst'%(dfcDir,i),1000000+i,'%08x'%i
+
+def localListing():
+  #1% of the files are missing locally, 1% have a wrong size, 1% are extra
+  for i in xrange(nFiles):
+    if i%100==0:
+      continue
+    size = 1000000+i
+    if i%100==1:
+      size = size-1
+    yield '%s/run_%07d_All_file001_SFO-1.dst'%(localDir,i),size,None
+  for i in xrange(nFiles/100):
+    yield '%s/extra_%07d.dst'%(localDir,i),1,None
+
+start = time.time()
+dfcIndex = buildIndex(dfcListing(),dfcDir)
+localIndex = buildIndex(localListing(),localDir)
+indexTime = time.time()-start
+
+start = time.time()
+result = compareIndexes(dfcIndex,localIndex)
+compareTime = time.time()-start
+
+print "files:      %d"%nFiles
+print "missing:    %d"%len(result['missing'])
+print "extra:      %d"%len(result['extra'])
+print "mismatched: %d"%len(result['mismatched'])
+print "index time:   %.2f s"%indexTime
+print "compare time: %.2f s"%compareTime
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Check the startup budget of the Badger API used by the besdirac-* scripts.
+   Imports IHEPDIRAC.Badger.API.Badger in a fresh interpreter, reports the
+   import time and fails if it is over budget or if a slow module which
+   should only be imported on demand has been loaded.
+   Usage :
+    python benchmarkStartup.py [budget seconds, default 2.0] [repeat, default 5]
+"""
+import sys
+import subprocess
+
+budget = 2.0
+repeat = 5
+if len(sys.argv)>1:
+  budget = float(sys.argv[1])
+if len(sys.argv)>2:
+  repeat = int(sys.argv[2])
+
+#modules that Badger.API.Badger must not import at module level
+lazyModules = [
+  'DIRAC.Interfaces.API.Dirac',
+  'DIRAC.DataManagementSystem.Client.FileCatalogClientCLI',
+  'IHEPDIRAC.Badger.DataLoader.DFC.readAttributes',
+]
+
+probe = """
+import sys,time
+start = time.time()
+import IHEPDIRAC.Badger.API.Badger
+print time.time()-start
+print ','.join(m for m in %r if m in sys.modules)
+""" % lazyModules
+
+times = []
+loaded = ''
+for i in range(repeat):
+  output = subprocess.check_output([sys.executable,'-c',probe]).strip().split('\n')
+  times.append(float(output[-2]))
+  loaded = output[-1]
+
+times.sort()
+print "import time: min %.3f s, median %.3f s, budget %.3f s"%(times[0],times[len(times)/2],budget)
+
+failed = False
+if times[len(times)/2] > budget:
+  print "FAILED: import of Badger API is over budget"
+  failed = True
+if loaded:
+  print "FAILED: modules imported at startup: %s"%loaded
+  failed = True
+if not failed:
+  print "OK"
+sys.exit(int(failed))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Check the comparison engine of besdirac-dms-check-files.
+   Usage :
+    python testCheckFiles.py
+"""
+from IHEPDIRAC.Badger.API.checkFiles import buildIndex,compareIndexes
+
+def test_empty():
+  result = compareIndexes(buildIndex([]),buildIndex([]))
+  assert result == {'missing':[],'extra':[],'mismatched':[],'failed':[]},result
+
+def test_relative_path():
+  index = buildIndex([('/dfc/dir/a.dst',1,None)],'/dfc/dir/')
+  assert index == {'a.dst':(1,None)},index
+
+def test_compare():
+  src = buildIndex([('/dfc/a',1,'0abc'),('/dfc/b',2,None),('/dfc/c',3,None)],'/dfc')
+  dst = buildIndex([('/local/a',1,'ABC'),('/local/b',5,None),('/local/d',4,None)],'/local')
+  result = compareIndexes(src,dst)
+  assert result['missing'] == ['c'],result
+  assert result['extra'] == ['d'],result
+  assert result['mismatched'] == [('b',(2,None),(5,None))],result
+
+def test_checksum():
+  #a checksum of None is not compared, the others are
+  src = buildIndex([('a',1,'00000abc'),('b',1,None),('c',1,'1')])
+  dst = buildIndex([('a',1,'ABC'),('b',1,'123'),('c',1,'2')])
+  result = compareIndexes(src,dst)
+  assert [m[0] for m in result['mismatched']] == ['c'],result
+
+def test_basename_collision():
+  duplicates = []
+  index = buildIndex([('/local/x/a.dst',1,None),('/local/y/a.dst',2,None)],
+                     basename=True,duplicates=duplicates)
+  assert index == {'a.dst':(1,None)},index
+  assert duplicates == ['/local/y/a.dst'],duplicates
+
+def test_failed():
+  #a file whose metadata could not be read is neither missing nor extra
+  src = buildIndex([('/dfc/a',1,None)],basename=True)
+  dst = buildIndex([('/local/a',1,None),('/local/b',2,None)],basename=True)
+  result = compareIndexes(src,dst,['b'])
+  assert result['extra'] == [],result
+  assert result['failed'] == ['b'],result
+
+if __name__ == "__main__":
+  for name,test in sorted(globals().items()):
+    if name.startswith('test_'):
+      test()
+      print "%s: OK"%name
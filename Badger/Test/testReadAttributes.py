@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Check the ExpSearch run range lookup of readAttributes.
+   readAttributes imports ROOT and amga, run it where the data loader runs.
+   The ranges are loaded with loadExpRanges, AMGA is not read.
+   Usage :
+    python testReadAttributes.py
+"""
+import os
+import sys
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..','DataLoader','AMGA'))
+from readAttributes import loadExpRanges,findExpRanges,getExpRes
+
+ranges = [(100,199,'exp1','jpsi'),
+          (200,299,'exp2','jpsi'),
+          #overlaps exp2 and exp4
+          (250,420,'exp3','jpsi'),
+          (300,399,'exp4','psip'),
+          (1000,1099,'exp10','jpsi')]
+
+def test_empty():
+  assert loadExpRanges([]) == 0
+  assert findExpRanges(150) == []
+  assert getExpRes([150]) is False
+
+def test_boundaries():
+  loadExpRanges(ranges)
+  assert [r[2] for r in findExpRanges(100)] == ['exp1']
+  assert [r[2] for r in findExpRanges(199)] == ['exp1']
+  assert [r[2] for r in findExpRanges(200)] == ['exp2']
+  assert findExpRanges(99) == []
+  assert findExpRanges(500) == []
+  assert findExpRanges(2000) == []
+
+def test_overlap():
+  loadExpRanges(ranges)
+  assert [r[2] for r in findExpRanges(260)] == ['exp2','exp3']
+  #exp3 is found behind exp4, which ends before it
+  assert [r[2] for r in findExpRanges(410)] == ['exp3']
+
+def test_getExpRes():
+  loadExpRanges(ranges)
+  assert getExpRes([150]) == {'resonance':'jpsi','expNum':'exp1'}
+  #the name does not depend on the order of the runs
+  assert getExpRes([1050,150]) == {'resonance':'jpsi','expNum':'mexp1p+10'}
+  assert getExpRes([150,1050]) == {'resonance':'jpsi','expNum':'mexp1p+10'}
+  #two resonances
+  assert getExpRes([350]) is False
+
+if __name__ == "__main__":
+  for name,test in sorted(globals().items()):
+    if name.startswith('test_'):
+      test()
+      print "%s: OK"%name
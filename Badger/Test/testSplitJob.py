@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Check the size-balanced splitting of splitJob --jobnum --balance.
+   Usage :
+    python testSplitJob.py
+"""
+import os
+import sys
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..','DataLoader','AMGA'))
+from splitJob import getBalancedRanges
+
+def checkRanges(ranges,linenum,jobnum):
+  #continuous, not empty, and all the lines are in a sub-job
+  assert len(ranges) == min(jobnum,linenum),ranges
+  linefrm = 0
+  for frm,to in ranges:
+    assert frm == linefrm and to > frm,ranges
+    linefrm = to
+  assert linefrm == linenum,ranges
+
+def test_empty():
+  assert getBalancedRanges([],3) == []
+
+def test_more_jobs_than_files():
+  ranges = getBalancedRanges([5,7],4)
+  assert ranges == [(0,1),(1,2)],ranges
+
+def test_one_job():
+  assert getBalancedRanges([1,2,3],1) == [(0,3)]
+
+def test_balanced():
+  costs = [10,10,10,10,40]
+  ranges = getBalancedRanges(costs,2)
+  checkRanges(ranges,len(costs),2)
+  assert ranges == [(0,4),(4,5)],ranges
+
+def test_big_first_file():
+  ranges = getBalancedRanges([100,1,1,1],2)
+  assert ranges == [(0,1),(1,4)],ranges
+
+def test_no_size():
+  #the missing files cost nothing, every sub-job still gets a line
+  costs = [0,0,0,0]
+  ranges = getBalancedRanges(costs,3)
+  checkRanges(ranges,len(costs),3)
+
+if __name__ == "__main__":
+  for name,test in sorted(globals().items()):
+    if name.startswith('test_'):
+      test()
+      print "%s: OK"%name
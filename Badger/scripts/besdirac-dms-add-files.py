@@ -20,6 +20,7 @@ from DIRAC.Core.Base import Script
 
 Script.registerSwitch("r","dir","the directory that dataset files located")
 Script.setUsageMessage(__doc__)
+Script.parseCommandLine(ignoreErrors=True)
 args = Script.getPositionalArgs()
 
 if len(args) == 0:
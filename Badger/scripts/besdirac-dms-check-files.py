@@ -2,8 +2,11 @@
 # -*- coding:utf-8 -*-
 # author: zhanggang
 '''checksum,compare the size of LFN files and Local files 
+   The files are matched by name: the files directly in dfcDir with the
+   files anywhere under localDir.
    Usage :
-    besdirac-dms-check-files <dfcDir> <localDir>
+    besdirac-dms-check-files [-c] <dfcDir> <localDir>
+    -c: also compare the adler32 checksums, the local files are read
     Example: besdirac-dms-check-files /dir1  /dir2
 '''
 import os.path
@@ -11,69 +14,54 @@ import pprint
 import DIRAC
 from DIRAC.Core.Base import Script
 
-from DIRAC.Resources.Catalog.FileCatalogClient import FileCatalogClient
 Script.setUsageMessage(__doc__)
+Script.registerSwitch("c","checksum","also compare the adler32 checksums")
 Script.parseCommandLine(ignoreErrors=True)
 from IHEPDIRAC.Badger.API.Badger import Badger
+from IHEPDIRAC.Badger.API.checkFiles import buildIndex,localEntries,compareIndexes
+
+withChecksum = False
+for k,v in Script.getUnprocessedSwitches():
+  if k in ('c','checksum'):
+    withChecksum = True
 
 badger = Badger()
 dirs = Script.getPositionalArgs()
 dfcdir = dirs[0]
 localDir = dirs[1]
 
-#get DFC file dict
+#listDir is not recursive and the local files are,
+#so both indexes are by file name, like the DFC directory
+#get DFC file index: name -> (size,checksum)
 lfns = badger.listDir(dfcdir)
-lfnDict = badger.getSize(lfns)
-base_lfnDict = {}
-for k,v in lfnDict.items():
-  k = os.path.basename(k)
-  base_lfnDict[k] = v
-#get local files dict
-localFiles = badger.getFilenamesByLocaldir(localDir)
-base_localDict = {}
-for file in localFiles:
-  base_localDict[os.path.basename(file)] = os.path.getsize(file)
+lfnDict = badger.getSizeAndChecksum(lfns)
+dfcIndex = buildIndex(((k,v[0],v[1]) for k,v in lfnDict.items()),basename=True)
+#the LFNs whose metadata could not be read are not compared
+failed = [os.path.basename(lfn) for lfn in lfns if lfn not in lfnDict]
+#get local file index: name -> (size,adler32 or None)
+#a checksum of None is not compared
+duplicates = []
+localIndex = buildIndex(localEntries(localDir,withChecksum),basename=True,
+                        duplicates=duplicates)
 
-filesOK = True
-omitList = []
-partList = []
-if len(lfns)>=len(localFiles):
-  for item in base_lfnDict.keys():
-    if item in base_localDict.keys():
-      if base_localDict[item]!=base_lfnDict[item]:
-        partList.append(item,base_localDict[item],base_lfnDict[item])
-        filesOK = False
-      else:
-        pass
-    else:
-      omitList.append(item)
-      filesOK = False
-  if partList:
-    print "these file has not transfer completely"
-    pprint.pprint(partList)
-  if omitList:
-    print "these file has not tranfer yet."
-    pprint.pprint(omitList)
-  if filesOK:
-    print "all are OK"
-else:
-  for item in base_localDict.keys():
-    if item in base_lfnDict.keys():
-      if base_lfnDict[item]!=base_localDict[item]:
-        partList.append(item,base_localDict[item],base_lfnDict[item])
-        filesOK = False
-      else:
-        pass
-    else:
-      omitList.append(item)
-      filesOK = False
-  if partList:
-    print "these file has not transfer completely"
-    pprint.pprint(partList)
-  if omitList:
-    print "these file has not tranfer yet."
-    pprint.pprint(omitList)
-  if filesOK:
-    print "all are OK"
+result = compareIndexes(dfcIndex,localIndex,failed)
+if result['mismatched']:
+  print "these file has not transfer completely"
+  pprint.pprint([(path,dst[0],src[0]) for path,src,dst in result['mismatched']])
+if result['missing']:
+  print "these file has not tranfer yet."
+  pprint.pprint(result['missing'])
+if result['extra']:
+  print "these local files are not in %s"%dfcdir
+  pprint.pprint(result['extra'])
+if result['failed']:
+  print "the size and checksum of these files can not be read from the DFC"
+  pprint.pprint(result['failed'])
+if duplicates:
+  print "these local files have the same name as another one, they are not compared"
+  pprint.pprint(sorted(duplicates))
+if not (result['mismatched'] or result['missing'] or result['extra']
+        or result['failed'] or duplicates):
+  print "all are OK"
 
 DIRAC.exit(0)
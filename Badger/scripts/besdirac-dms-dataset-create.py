@@ -19,6 +19,7 @@ from DIRAC.Core.Base import Script
 
 Script.setUsageMessage(__doc__)
 
+Script.parseCommandLine(ignoreErrors=True)
 args = Script.getPositionalArgs()
 #print len(args)
 if len(args)<3:
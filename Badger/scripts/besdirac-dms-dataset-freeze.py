@@ -12,6 +12,7 @@ from DIRAC import S_OK, S_ERROR, gLogger, exit
 from DIRAC.Core.Base import Script
 
 Script.setUsageMessage(__doc__)
+Script.parseCommandLine(ignoreErrors=True)
 args = Script.getPositionalArgs()
 
 if len(args)!=1:
@@ -18,9 +18,6 @@ Script.parseCommandLine( ignoreErrors = False )
 options = Script.getUnprocessedSwitches()
 args = Script.getPositionalArgs()
 
-from DIRAC.Interfaces.API.Dirac import Dirac
-dirac = Dirac()
-
 from DIRAC.Resources.Catalog.FileCatalogClient import FileCatalogClient
 fccType = 'DataManagement/FileCatalog'
 fcc = FileCatalogClient(fccType)
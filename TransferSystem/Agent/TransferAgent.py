@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 __RCSID__ = "$Id: $"
 
+import os
+import time
+
 from DIRAC import gLogger, gConfig, S_OK, S_ERROR
 from DIRAC.Core.Base.AgentModule import AgentModule
 
@@ -13,16 +16,59 @@ class TransferAgent(AgentModule):
 
     self.MAX_TRANSFER = self.am_getOption("MAX_TRANSFER", 2)
     self.MAX_RETRY = self.am_getOption("MAX_RETRY", 3)
+    # the max number of files transferred by one worker process
+    self.BATCH_SIZE = self.am_getOption("BATCH_SIZE", 20)
+    # limit of the workers on one link (srcSE, dstSE), 0 means no limit
+    self.MAX_TRANSFER_PER_LINK = self.am_getOption("MAX_TRANSFER_PER_LINK", 0)
+    # e.g. LinkLimits = IHEP-USER:JINR-USER:4, IHEP-USER:IHEPD-USER:1
+    self.LINK_LIMITS = self.am_getOption("LinkLimits", [])
+    # target rate of one link in MB/s, 0 means no target
+    self.TARGET_RATE = self.am_getOption("TARGET_RATE", 0)
+    # e.g. LinkTargetRates = IHEP-USER:JINR-USER:50
+    self.LINK_TARGET_RATES = self.am_getOption("LinkTargetRates", [])
+    # how long one execute waits on the workers,
+    # default is the polling time, so the workers are never left alone
+    self.CYCLE_TIME = self.am_getOption("CYCLE_TIME", self.am_getPollingTime())
+    # how often the DB is checked for new files
+    self.CHECK_INTERVAL = self.am_getOption("CHECK_INTERVAL", 10)
+    # how often the DB is checked for killed files, it is one query
+    self.KILL_CHECK_INTERVAL = self.am_getOption("KILL_CHECK_INTERVAL", 2)
+    # the accounting records are sent together, when there are
+    # ACCOUNTING_MAX_RECORDS of them or every ACCOUNTING_INTERVAL seconds
+    self.ACCOUNTING_MAX_RECORDS = self.am_getOption("ACCOUNTING_MAX_RECORDS", 100)
+    self.ACCOUNTING_INTERVAL = self.am_getOption("ACCOUNTING_INTERVAL", 60)
     gLogger.info("MAX_TRANSFER: ", self.MAX_TRANSFER)
 
-    self.transfer_worker = []
-
     global gTransferDB
     from IHEPDIRAC.TransferSystem.DB.TransferDB import TransferDB
     from IHEPDIRAC.TransferSystem.Agent.helper import helper_TransferAgent
+    from IHEPDIRAC.TransferSystem.Agent.helper.WorkerManager import WorkerManager
+    from IHEPDIRAC.TransferSystem.Agent.helper.LinkScheduler import LinkScheduler
+    from IHEPDIRAC.TransferSystem.Agent.helper.AccountingBuffer import AccountingBuffer
+    from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory import gTransferFactory
     gTransferDB = TransferDB()
 
-    self.helper = helper_TransferAgent(self, gTransferDB)
+    # load the worker classes once, the agent creates workers with them
+    # in its inner loop
+    self.factory = gTransferFactory
+    gLogger.info("Transfer protocols: ", self.factory.preload())
+
+    self.manager = WorkerManager(self.MAX_TRANSFER,
+                                 self.MAX_TRANSFER_PER_LINK or None,
+                                 WorkerManager.parse_link_limits(self.LINK_LIMITS))
+    # the helper appends the new workers here
+    self.transfer_worker = self.manager.workers
+    self.scheduler = LinkScheduler(self.manager,
+                                   self.TARGET_RATE or None,
+                                   WorkerManager.parse_link_limits(self.LINK_TARGET_RATES, float))
+
+    # the records not sent before a restart are kept in the journal
+    self.accounting = AccountingBuffer(os.path.join(self.am_getWorkDirectory(),
+                                                    "accounting.journal"),
+                                       self.ACCOUNTING_MAX_RECORDS,
+                                       self.ACCOUNTING_INTERVAL)
+
+    self.helper = helper_TransferAgent(self, gTransferDB, self.accounting)
 
     return S_OK()
 
@@ -31,64 +77,111 @@ class TransferAgent(AgentModule):
     gLogger.info("execute: ", self.count)
     self.count += 1
 
-    # Handle the existed transfer worker
-    for worker in self.transfer_worker[:]:
-      # check worker status
-      self.helper.check_worker_status(worker)
-      # worker is TransferWorker
-      retcode = worker.get_retcode()
-      if retcode is not None:
-        # Make sure the failed job can retransfer
-        worker.info["retransfer"]+=1
-        # Handle retcode
-        worker.handle_waiting()
-        result = worker.handle_exit(retcode)
-        
-        if result:
-          gLogger.error("There is some errors!")
-          gLogger.error(result)
-          # if we can retransfer, try to retransfer
-          if worker.info["retransfer"] < self.MAX_RETRY:
-            # retransfer
-            gLogger.info("Try to Retransfer (%d) "% worker.info["retransfer"])
-            worker.create_popen(worker.info)
-            continue
-          self.helper.helper_error_report(worker, result)
-          worker.info["error"] = result
-
-        self.transfer_worker.remove(worker)
-        self.helper.helper_remove_transfer(worker)
-      else:
-        # the job is not OK
-        worker.handle_waiting()
-      pass
-    else:
-      # the transfer work are all working
-      pass
-
-    # Create new transfer worker
-    idle_worker = self.MAX_TRANSFER - len(self.transfer_worker)
-    if idle_worker:
-      for i in xrange(idle_worker):
-        # append a new worker
-        # if can't add, just break
-        if not self.add_new_transfer():
-          break
-        gLogger.info("Add a new Transfer")
+    # touch <ControlDirectory>/reload_workers to reload the worker classes
+    reload_file = os.path.join(self.am_getControlDirectory(), "reload_workers")
+    if os.path.exists(reload_file):
+      gLogger.info("Reload the transfer worker classes")
+      self.factory.reload()
+      os.remove(reload_file)
+
+    # Handle the workers until CYCLE_TIME is used up.
+    # As soon as a worker exits, its slot is given to a new transfer.
+    deadline = time.time() + self.CYCLE_TIME
+    next_check = 0
+    next_kill_check = 0
+    slot_freed = True
+    while True:
+      now = time.time()
+      if now >= next_kill_check:
+        # check worker status, one query for all the workers
+        self.helper.check_workers_status(self.transfer_worker)
+        next_kill_check = now + self.KILL_CHECK_INTERVAL
+      if now >= next_check:
+        next_check = now + self.CHECK_INTERVAL
+        # there may be new requests
+        slot_freed = True
+
+      self.accounting.flush_if_due()
+
+      # Create new transfer worker
+      if slot_freed and self.manager.free_slots():
+        self.add_new_transfer(self.manager.free_slots())
+      slot_freed = False
+
+      remaining = deadline - time.time()
+      if not self.transfer_worker or remaining <= 0:
+        break
+
+      # Handle the exited transfer worker
+      timeout = min(remaining, next_check - time.time(), next_kill_check - time.time())
+      for worker in self.manager.wait(max(0, timeout)):
+        if self.handle_exited_worker(worker):
+          slot_freed = True
 
     return S_OK()
 
-  def add_new_transfer(self):
+  def finalize(self):
+    # send the accounting records which are still in the buffer
+    self.accounting.flush()
+    return S_OK()
+
+  def handle_exited_worker(self, worker):
+    """
+      handle the worker whose process exited.
+      return True if the worker is removed,
+      False if it is retransferring.
     """
-      if add a new, return true,
-      else return false
+    # worker is TransferWorker
+    retcode = worker.get_retcode()
+    # Make sure the failed job can retransfer
+    worker.info["retransfer"]+=1
+    # Handle retcode
+    worker.drain()
+    errors = worker.file_errors(retcode)
+    killed = worker.info.get("killed", ())
+    failed = []
+    for f in worker.files:
+      f["error"] = errors.get(f["id"], "")
+      if f["error"] and f["id"] not in killed:
+        failed.append(f)
+
+    if failed:
+      gLogger.error("There is some errors!")
+      for f in failed:
+        gLogger.error(f["LFN"], f["error"])
+      # if we can retransfer, try to retransfer the failed files
+      if worker.info["retransfer"] < self.MAX_RETRY:
+        # retransfer
+        gLogger.info("Try to Retransfer (%d) "% worker.info["retransfer"])
+        # the OK files and the killed ones, which keep their error
+        done = [f for f in worker.files if f not in failed]
+        self.helper.helper_finish_files(done)
+        worker.info["done"].extend(done)
+        worker.info["files"] = failed
+        worker.create_popen(worker.info)
+        return False
+      self.helper.helper_error_report(worker, failed)
+
+    self.manager.remove(worker)
+    self.helper.helper_remove_transfer(worker)
+    self.scheduler.record(worker)
+    return True
+
+  def add_new_transfer(self, n):
     """
-    # << Get New File >>
-    result = self.helper.helper_get_new_request()
-    gLogger.info(result)
-    if not result:
-      return False
+      add up to n new workers, each of them transfers
+      up to BATCH_SIZE files.
+      return the number of added workers
+    """
+    # << Get New Files >>
+    # they are claimed at once, so the cost doesn't grow with n.
+    # the scheduler shares the workers between the requests, by priority and weight
+    batch_size = self.BATCH_SIZE
+    results = self.helper.helper_get_new_files(n, self.scheduler, batch_size)
+    gLogger.info(results)
 
     # << Add New Transfer >>
-    return self.helper.helper_add_transfer(result)
-
+    added = self.helper.helper_add_transfers(results, batch_size,
+                                             self.scheduler.link_free_slots)
+    gLogger.info("Add %d new Transfer" % added)
+    return added
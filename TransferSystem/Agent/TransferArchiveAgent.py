@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+__RCSID__ = "$Id: $"
+
+from DIRAC import gLogger, gConfig, S_OK, S_ERROR
+from DIRAC.Core.Base.AgentModule import AgentModule
+
+global gTransferDB
+
+class TransferArchiveAgent(AgentModule):
+  """
+  Move the files of the requests finished more than ARCHIVE_AGE days
+  ago from TransferFileList to TransferFileListArchive, so the tables
+  used by the TransferAgent and the services do not only grow.
+  A summary of each request stays in TransferRequestSummary.
+  """
+
+  def initialize(self):
+    # the requests finished more than ARCHIVE_AGE days ago are archived
+    self.ARCHIVE_AGE = self.am_getOption("ARCHIVE_AGE", 30)
+    # files moved in one transaction
+    self.ARCHIVE_BATCH = self.am_getOption("ARCHIVE_BATCH", 1000)
+    # max files moved in one cycle, the rest is for the next cycles
+    self.ARCHIVE_MAX_FILES = self.am_getOption("ARCHIVE_MAX_FILES", 100000)
+    # max requests checked in one cycle
+    self.ARCHIVE_MAX_REQUESTS = self.am_getOption("ARCHIVE_MAX_REQUESTS", 100)
+    gLogger.info("ARCHIVE_AGE: ", self.ARCHIVE_AGE)
+
+    global gTransferDB
+    from IHEPDIRAC.TransferSystem.DB.TransferDB import TransferDB
+    gTransferDB = TransferDB()
+
+    return S_OK()
+
+  def execute(self):
+    res = gTransferDB.get_ArchivableRequests(self.ARCHIVE_AGE, self.ARCHIVE_MAX_REQUESTS)
+    if not res["OK"]:
+      gLogger.error(res)
+      return res
+    moved = 0
+    for trans_req_id in res["Value"]:
+      if moved >= self.ARCHIVE_MAX_FILES:
+        break
+      res = gTransferDB.archive_TransferFileList(trans_req_id,
+                                                 self.ARCHIVE_BATCH,
+                                                 self.ARCHIVE_MAX_FILES - moved)
+      if not res["OK"]:
+        gLogger.error("archive request %s error: " % trans_req_id, res["Message"])
+        continue
+      gLogger.info("request %s: %d files archived" % (trans_req_id, res["Value"]))
+      moved += res["Value"]
+    gLogger.info("%d files archived" % moved)
+    return S_OK()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import time
+
+from DIRAC import gLogger, S_OK, S_ERROR
+from DIRAC.Core.DISET.RPCClient import RPCClient
+
+from IHEPDIRAC.AccountingSystem.Client.Types.DataTransfer import DataTransfer
+
+class AccountingBuffer(object):
+  """
+  Collect the DataTransfer records of the finished workers
+  and send them to the accounting together, in one RPC,
+  when there are max_records of them or every interval seconds.
+  The records are also appended to a journal file, so the records
+  not sent yet are sent after a restart of the agent.
+  When a send fails, the next one waits interval seconds, doubled after
+  each failure up to MAX_BACKOFF, so the agent loop is not blocked by
+  a call to the accounting for every record while it is down.
+  """
+
+  # max seconds between two sends while the accounting fails
+  MAX_BACKOFF = 3600
+
+  def __init__(self, journal=None, max_records=100, interval=60):
+    self.journal = journal
+    self.max_records = max_records
+    self.interval = interval
+    self.records = []
+    self.last_flush = time.time()
+    # no send before retry_at, after failures sends in a row
+    self.failures = 0
+    self.retry_at = 0
+    self.load()
+
+  def load(self):
+    """ the records of the journal, they were not sent before the restart """
+    if not self.journal or not os.path.exists(self.journal):
+      return
+    with open(self.journal) as f:
+      for line in f:
+        try:
+          self.records.append(json.loads(line))
+        except ValueError:
+          # the last line of a crash may be cut
+          gLogger.warn("Wrong accounting record in journal: ", line)
+    gLogger.info("%d accounting records from the journal" % len(self.records))
+
+  def add(self, values, start, end):
+    """
+    values: the values of a DataTransfer,
+    start, end: the transfer time (seconds since epoch)
+    """
+    record = {"values": values, "start": start, "end": end}
+    self.records.append(record)
+    if self.journal:
+      with open(self.journal, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    if len(self.records) >= self.max_records and time.time() >= self.retry_at:
+      self.flush()
+
+  def flush_if_due(self):
+    now = time.time()
+    if self.records and now - self.last_flush >= self.interval and now >= self.retry_at:
+      self.flush()
+
+  def flush(self):
+    """ send all the records in one RPC, keep them if it fails """
+    self.last_flush = time.time()
+    if not self.records:
+      return S_OK(0)
+    registers = []
+    for record in self.records:
+      acct_dt = DataTransfer()
+      acct_dt.setValuesFromDict(record["values"])
+      acct_dt.setStartTime(datetime.datetime.utcfromtimestamp(record["start"]))
+      acct_dt.setEndTime(datetime.datetime.utcfromtimestamp(record["end"]))
+      res = acct_dt.checkValues()
+      if not res["OK"]:
+        gLogger.error("Wrong accounting record: ", res["Message"])
+        continue
+      registers.append(acct_dt.getValues()["Value"])
+    res = RPCClient("Accounting/DataStore").commitRegisters(registers)
+    if not res["OK"]:
+      self.failures += 1
+      backoff = min(self.interval * 2 ** (self.failures - 1), self.MAX_BACKOFF)
+      self.retry_at = time.time() + backoff
+      gLogger.error("Send accounting data error, next try in %d s: " % backoff, res["Message"])
+      return res
+    gLogger.info("Submit Accounting Data: %d records" % len(registers))
+    self.failures = 0
+    self.retry_at = 0
+    self.records = []
+    if self.journal and os.path.exists(self.journal):
+      os.remove(self.journal)
+    return S_OK(len(registers))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import math
+import time
+
+from DIRAC import gLogger
+
+class LinkScheduler(object):
+  """
+  Decide how many new workers each link (srcSE, dstSE) and request get.
+    * the throughput of one worker on a link is measured from the
+      finished workers (size of the OK files / time of the worker).
+    * a link with a target rate gets the workers it needs to reach it,
+      ceil(target / rate of one worker), within the limits of the
+      WorkerManager.
+    * the free slots are given one by one to the requests. The requests
+      with the highest priority (and room on their link) are served
+      first. Between the requests of the same priority, the slots are
+      shared with deficit round-robin: each round, every user gets one
+      slot, split between its requests in proportion to their weights.
+      So a big request of one user does not starve the other users,
+      and a small urgent request is not stuck behind a big one.
+  """
+
+  # weight of the newest measure in the average rate of a link
+  ALPHA = 0.3
+
+  def __init__(self, manager, target_rate=None, link_targets=None):
+    """
+    target_rate: default target of a link in MB/s, None means no target
+    link_targets: {(srcSE, dstSE): MB/s}, overrides the default
+    """
+    self.manager = manager
+    self.target_rate = target_rate
+    self.link_targets = link_targets or {}
+    # {link: bytes/s of one worker}
+    self.rates = {}
+    # {request id: deficit}, the slots a request can still get,
+    # kept between the cycles
+    self.deficits = {}
+
+  def link_target(self, link):
+    return self.link_targets.get(link, self.target_rate)
+
+  def record(self, worker):
+    """
+    measure the rate of a finished worker,
+    from the bytes of each file and the span from the first start to the
+    last end when the worker reports them (the files of a batch can be
+    copied in parallel), else from the file sizes and the lifetime of
+    the worker.
+    """
+    stats = worker.file_stats()
+    if stats:
+      size = sum(s[0] for s in stats.values())
+      seconds = max(s[2] for s in stats.values()) - min(s[1] for s in stats.values())
+    else:
+      files = worker.info["done"] + worker.files
+      size = sum(worker.file_sizes.get(f["LFN"], 0) for f in files if not f.get("error"))
+      seconds = time.time() - worker.start_time
+    if size <= 0 or seconds <= 0:
+      return
+    rate = size / seconds
+    link = self.manager.link_of(worker)
+    if link in self.rates:
+      rate = self.rates[link] + self.ALPHA * (rate - self.rates[link])
+    self.rates[link] = rate
+    gLogger.info("link %s -> %s: %.2f MB/s per worker" % (link[0], link[1], rate / 1e6))
+
+  def wanted_workers(self, link):
+    """ the workers needed for the target rate of link, None if unknown """
+    target = self.link_target(link)
+    if not target or not self.rates.get(link):
+      return None
+    return max(1, int(math.ceil(target * 1e6 / self.rates[link])))
+
+  def link_free_slots(self, link):
+    """ the number of workers which can still be added on link """
+    free = self.manager.link_free_slots(link)
+    wanted = self.wanted_workers(link)
+    if wanted is None:
+      return free
+    return max(0, min(free, wanted - self.manager.running(link)))
+
+  def allocate(self, n, requests, pending=None):
+    """
+    share up to n new workers between requests, [TransRequestEntryWithID, ...]
+    pending: {request id: number of workers} already given
+             but not started yet
+    return {request id: number of workers}
+    """
+    pending = pending or {}
+    link_free = {}
+    for req in requests:
+      link = (req.srcSE, req.dstSE)
+      if link not in link_free:
+        link_free[link] = self.link_free_slots(link)
+    for req in requests:
+      link_free[(req.srcSE, req.dstSE)] -= pending.get(req.id, 0)
+    # a request which is gone (or without *new* files) starts again
+    # from no deficit, like an empty queue in deficit round-robin
+    ids = set(req.id for req in requests)
+    for id in self.deficits.keys():
+      if id not in ids:
+        del self.deficits[id]
+
+    allocation = {}
+    for i in range(n):
+      candidates = [req for req in requests if link_free[(req.srcSE, req.dstSE)] > 0]
+      if not candidates:
+        break
+      top = max(req.priority for req in candidates)
+      req = self.next_request([req for req in candidates if req.priority == top])
+      allocation[req.id] = allocation.get(req.id, 0) + 1
+      link_free[(req.srcSE, req.dstSE)] -= 1
+    return allocation
+
+  def quanta(self, requests):
+    """ {request id: slots per round}, one slot per user and round,
+        split between its requests in proportion to their weights """
+    weights = {}
+    for req in requests:
+      weights[req.username] = weights.get(req.username, 0) + max(1, req.weight)
+    return dict((req.id, float(max(1, req.weight)) / weights[req.username])
+                  for req in requests)
+
+  def next_request(self, requests):
+    """ deficit round-robin: the request with the largest deficit of
+        at least one slot gets it. if there is none, the rounds are
+        played until one request has one slot. """
+    quanta = self.quanta(requests)
+    for req in requests:
+      self.deficits.setdefault(req.id, 0.0)
+    # a small margin for the rounding of the quanta
+    ready = [req for req in requests if self.deficits[req.id] >= 1 - 1e-9]
+    if not ready:
+      rounds = min(math.ceil((1 - self.deficits[req.id]) / quanta[req.id] - 1e-9)
+                     for req in requests)
+      for req in requests:
+        self.deficits[req.id] += rounds * quanta[req.id]
+      ready = [req for req in requests if self.deficits[req.id] >= 1 - 1e-9]
+    req = max(ready, key=lambda req: (self.deficits[req.id], -req.id))
+    self.deficits[req.id] -= 1
+    return req
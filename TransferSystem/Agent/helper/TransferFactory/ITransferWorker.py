@@ -6,6 +6,7 @@ import subprocess
 import time
 import select
 import sys
+import os
 
 import DIRAC
 from DIRAC import gLogger
@@ -15,9 +16,14 @@ class ITransferWorker(object):
   This is an Interface.
   """
 
+  # the max number of files which one process can transfer
+  MAX_BATCH = 1
+
   def __init__(self):
     self._proc = None
     self._buffer = ""
+    self._streams = []
+    self._partial = {}
 
   @property
   def proc(self):
@@ -27,6 +33,11 @@ class ITransferWorker(object):
   def info(self):
     return self._info
 
+  @property
+  def files(self):
+    """the files of the current process, [{"id": id, "LFN": LFN}, ...]"""
+    return self._info["files"]
+
   def get_retcode(self):
     return self.proc.poll()
 
@@ -43,6 +54,41 @@ class ITransferWorker(object):
         stderr=subprocess.PIPE
         )
     # Make sure that the stdout is to PIPE.
+    self._streams = [self._proc.stdout, self._proc.stderr]
+    self._partial = {}
+
+  def streams(self):
+    """the output streams of the process which are not at EOF yet.
+    A worker manager can select on them for all workers together."""
+    return self._streams
+
+  def handle_read(self, stream):
+    """read what is available in stream without blocking.
+    Call it only when select says stream is ready.
+    The complete lines are passed to handle_line."""
+    data = os.read(stream.fileno(), 65536)
+    if not data:
+      # EOF
+      self._streams.remove(stream)
+      rest = self._partial.pop(stream, "")
+      if rest:
+        self._buffer += self.handle_line(rest)
+      return
+    lines = (self._partial.get(stream, "") + data).split("\n")
+    self._partial[stream] = lines.pop()
+    for line in lines:
+      self._buffer += self.handle_line(line + "\n")
+
+  def drain(self, timeout=5):
+    """read the rest of the output after the process exited.
+    Give up after timeout seconds, e.g. a child of the process
+    may still keep the pipe open."""
+    deadline = time.time() + timeout
+    while self._streams:
+      remaining = deadline - time.time()
+      if remaining <= 0:
+        break
+      self.handle_waiting(remaining)
 
   def build_cmd(self, info):
     raise NotImplementedError
@@ -50,6 +96,22 @@ class ITransferWorker(object):
   def handle_exit(self, returncode):
     raise NotImplementedError
 
+  def file_errors(self, returncode):
+    """
+    the result of each file after the process exited, {id: error}.
+    An empty error means the file is OK.
+    By default the result of handle_exit is used for all the files.
+    """
+    error = self.handle_exit(returncode) or ""
+    return dict((f["id"], error) for f in self.files)
+
+  def file_stats(self):
+    """
+    {id: (bytes, start, end)} of the OK files,
+    empty if the process does not report them.
+    """
+    return {}
+
   def handle_stream(self, stream):
     buffer_line = ""
     try:
@@ -63,20 +125,81 @@ class ITransferWorker(object):
   def handle_line(self, line):
     raise NotImplementedError
 
-  def handle_waiting(self):
-    if not self._proc:
+  def handle_waiting(self, timeout=1):
+    if not self._proc or not self._streams:
       return
 
-    r,w,x = select.select( [self._proc.stdout, self._proc.stderr], 
-                           [], 
-                           [self._proc.stdout, self._proc.stderr]
-                           , 1 )
+    r,w,x = select.select( self._streams, [], [], timeout )
     for out in r:
       # ready for reading
-      self._buffer += self.handle_stream( out )
-    for out in x:
-      # exceptional condition
-      self._buffer += self.handle_stream( out )
+      self.handle_read( out )
+
+class BatchTransferWorker(ITransferWorker):
+  """
+  Transfer a list of files in one process
+  with besdirac-transfer-replicate-files,
+  which prints the result of each file in one line.
+  """
+
+  MAX_BATCH = 100
+
+  def __init__(self):
+    super(BatchTransferWorker, self).__init__()
+    # {LFN: (bytes, start, end)}, kept over the retransfers
+    self._stats = {}
+
+  def create_popen(self, info):
+    self._results = {}
+    super(BatchTransferWorker, self).create_popen(info)
+
+  def build_cmd(self, info):
+    cmd_list = ["besdirac-transfer-replicate-files",
+                  info["srcSE"],
+                  info["dstSE"]]
+    cmd_list.extend(f["LFN"] for f in info["files"])
+    return cmd_list
+
+  def handle_exit(self, returncode):
+    if returncode is None:
+      return
+    if returncode != 0:
+      return  self._buffer
+
+  def file_errors(self, returncode):
+    missing = self.handle_exit(returncode) or ("no result\n" + self._buffer)
+    return dict((f["id"], self._results.get(f["LFN"], missing))
+                  for f in self.files)
+
+  def file_stats(self):
+    """
+    {id: (bytes, start, end)} of the OK files which report them,
+    also the files done before a retransfer.
+    start and end are the seconds since epoch.
+    """
+    return dict((f["id"], self._stats[f["LFN"]])
+                  for f in self.info.get("done", []) + self.files
+                  if f["LFN"] in self._stats)
+
+  def handle_line(self, line):
+    fields = line.strip().split(" ", 2)
+    if fields[0] == "TRANSFER_OK" and len(fields) > 1:
+      self._results[fields[1]] = ""
+      # optional: <bytes> <start> <end>, or <bytes> <seconds>
+      try:
+        stats = fields[2].split()
+        size = int(stats[0])
+        if len(stats) > 2:
+          start, end = float(stats[1]), float(stats[2])
+        else:
+          end = time.time()
+          start = end - float(stats[1])
+        self._stats[fields[1]] = (size, start, end)
+        gLogger.info("%s: %d bytes in %.1f s" % (fields[1], size, end - start))
+      except (IndexError, ValueError):
+        pass
+    elif fields[0] == "TRANSFER_FAILED" and len(fields) > 1:
+      self._results[fields[1]] = (fields[2:] or ["failed"])[0]
+    return line
 
 class DemoTransferWorker(ITransferWorker):
 
@@ -2,30 +2,12 @@
 
 from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.ITransferWorker import *
 
-class DIRACDMSTransferWorker(ITransferWorker):
-
-  def build_cmd(self, info):
-    LFN = info["LFN"]
-    srcSE = info["srcSE"]
-    dstSE = info["dstSE"]
-
-    cmd_list = [#"dirac-dms-fts-submit", 
-                  "dirac-dms-replicate-lfn",
-                  LFN,
-                  dstSE,
-                  srcSE,
-                  "-c",
-                  "y"]
-    return cmd_list
-
-  def handle_exit(self, returncode):
-    if returncode is None:
-      return
-    if returncode != 0:
-      return  self._buffer 
-
-  def handle_line(self, line):
-    return line
+class DIRACDMSTransferWorker(BatchTransferWorker):
+  """
+  replicate the files with the DataManager,
+  one process for the whole batch.
+  """
+  pass
 
 if __name__ == "__main__":
 
@@ -34,7 +16,7 @@ if __name__ == "__main__":
   Script.parseCommandLine( ignoreErrors = True )
 
   dtw = DIRACDMSTransferWorker()
-  info = {"LFN":"/users/l/lintao/README_IHEPD",
+  info = {"files": [{"id": 1, "LFN": "/users/l/lintao/README_IHEPD"}],
           "srcSE": "IHEP-USER",
           "dstSE": "JINR-USER"}
   dtw.create_popen(info)
@@ -45,7 +27,7 @@ if __name__ == "__main__":
     dtw.handle_waiting()
     returncode = dtw.get_retcode()
   else:
-    dtw.handle_waiting()
-    print dtw.handle_exit(returncode)
+    dtw.drain()
+    print dtw.file_errors(returncode)
 
   print "Work Done."
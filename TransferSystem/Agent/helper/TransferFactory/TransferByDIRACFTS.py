@@ -1,29 +1,18 @@
 # -*- coding: utf-8 -*-
 from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.ITransferWorker import *
 
-class DIRACFTSTransferWorker(ITransferWorker):
+class DIRACFTSTransferWorker(BatchTransferWorker):
+  """
+  submit the whole batch in one FTS job.
+  """
+
+  MAX_BATCH = 500
 
   def build_cmd(self, info):
-    LFN = info["LFN"]
-    srcSE = info["srcSE"]
-    dstSE = info["dstSE"]
-
-    cmd_list = ["dirac-dms-fts-submit", 
-                  LFN,
-                  srcSE,
-                  dstSE]
+    cmd_list = super(DIRACFTSTransferWorker, self).build_cmd(info)
+    cmd_list.append("--fts")
     return cmd_list
 
-  def handle_exit(self, returncode):
-    return  self._buffer 
-    if returncode is None:
-      return
-    if returncode != 0:
-      return  self._buffer 
-
-  def handle_line(self, line):
-    return line
-
 
 
 if __name__ == "__main__":
@@ -33,7 +22,7 @@ if __name__ == "__main__":
   Script.parseCommandLine( ignoreErrors = True )
 
   dtw = DIRACFTSTransferWorker()
-  info = {"LFN":"/bes/user/z/zhangxm/dataTest/file9",
+  info = {"files": [{"id": 1, "LFN": "/bes/user/z/zhangxm/dataTest/file9"}],
           "srcSE": "IHEP-USER",
           "dstSE": "JINR-USER"}
   dtw.create_popen(info)
@@ -44,7 +33,7 @@ if __name__ == "__main__":
     dtw.handle_waiting()
     returncode = dtw.get_retcode()
   else:
-    dtw.handle_waiting()
-    print dtw.handle_exit(returncode)
+    dtw.drain()
+    print dtw.file_errors(returncode)
 
   print "Work Done."
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import gfal2
+
+from DIRAC.Resources.Storage.StorageElement import StorageElement
+from DIRAC.Resources.Catalog.FileCatalog import FileCatalog
+
+from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.ITransferWorker import *
+
+class GFAL2Copy(threading.Thread):
+  """
+  copy the files with gfal2 in a thread of the agent,
+  so there is no new process and DIRAC environment for each batch.
+  It looks like a Popen for the worker: poll() and kill().
+  The result of each file is written to the pipe fd,
+  in the lines of besdirac-transfer-replicate-files:
+    TRANSFER_OK <LFN> <bytes> <start> <end>
+    TRANSFER_FAILED <LFN> <reason>
+  """
+
+  # the protocols of the SE URLs, in the order of preference
+  PROTOCOLS = ["srm", "gsiftp", "root", "http"]
+
+  def __init__(self, info, fd, nbstreams, timeout, markers):
+    super(GFAL2Copy, self).__init__()
+    self.daemon = True
+    self.info = info
+    self.fd = fd
+    self.nbstreams = nbstreams
+    self.timeout = timeout
+    # {LFN: (transferred bytes, average speed)}, updated by the performance markers
+    self.markers = markers
+    self.returncode = None
+    self.killed = False
+    self.ctx = None
+
+  def poll(self):
+    return self.returncode
+
+  def kill(self):
+    self.killed = True
+    if self.ctx is not None:
+      self.ctx.cancel()
+
+  def report(self, lfn, error, size=0, start=0, end=0):
+    if error:
+      line = "TRANSFER_FAILED %s %s\n" % (lfn, str(error).replace("\n", " "))
+    else:
+      line = "TRANSFER_OK %s %d %.3f %.3f\n" % (lfn, size, start, end)
+    os.write(self.fd, line)
+
+  def run(self):
+    lfns = [f["LFN"] for f in self.info["files"]]
+    try:
+      try:
+        self.ctx = gfal2.creat_context()
+        self.copy_files(lfns)
+        self.returncode = 0
+      except Exception as e:
+        gLogger.exception("gfal2 transfer error")
+        for lfn in lfns:
+          self.report(lfn, e)
+        self.returncode = 1
+      if self.killed:
+        self.returncode = -9
+    finally:
+      # returncode is set before EOF, so the worker is exited at EOF
+      os.close(self.fd)
+
+  def get_urls(self, seName, lfns):
+    res = StorageElement(seName).getURL(lfns, self.PROTOCOLS)
+    if not res["OK"]:
+      return dict((lfn, None) for lfn in lfns), res["Message"]
+    return res["Value"]["Successful"], res["Value"]["Failed"]
+
+  def copy_files(self, lfns):
+    srcSE = self.info["srcSE"]
+    dstSE = self.info["dstSE"]
+    fc = FileCatalog()
+    res = fc.getFileMetadata(lfns)
+    if not res["OK"]:
+      raise Exception(res["Message"])
+    metadata = res["Value"]["Successful"]
+    srcURLs, srcFailed = self.get_urls(srcSE, lfns)
+    dstURLs, dstFailed = self.get_urls(dstSE, lfns)
+
+    for lfn in lfns:
+      if self.killed:
+        self.report(lfn, "killed")
+        continue
+      if lfn not in metadata:
+        self.report(lfn, "no metadata: %s" % res["Value"]["Failed"].get(lfn))
+        continue
+      if not srcURLs.get(lfn) or not dstURLs.get(lfn):
+        self.report(lfn, "no URL: %s %s" % (srcFailed.get(lfn, ""), dstFailed.get(lfn, "")))
+        continue
+      self.copy_file(fc, lfn, srcURLs[lfn], dstURLs[lfn], metadata[lfn])
+
+  def copy_file(self, fc, lfn, src, dst, metadata):
+    params = self.ctx.transfer_parameters()
+    params.nbstreams = self.nbstreams
+    params.timeout = self.timeout
+    params.overwrite = True
+    params.create_parent = True
+    # compare the checksums of the source and the destination
+    # with the one in the catalog
+    params.checksum_check = True
+    if metadata.get("Checksum"):
+      params.set_user_defined_checksum("ADLER32", metadata["Checksum"])
+    def monitor(src, dst, average, instant, transferred, elapsed):
+      self.markers[lfn] = (transferred, average)
+    params.monitor_callback = monitor
+
+    start = time.time()
+    try:
+      self.ctx.filecopy(params, src, dst)
+    except gfal2.GError as e:
+      self.report(lfn, e)
+      return
+    end = time.time()
+    # the size in the catalog, else the bytes of the last performance marker
+    size = metadata.get("Size") or self.markers.get(lfn, (0, 0))[0]
+
+    res = fc.addReplica({lfn: {"SE": self.info["dstSE"], "PFN": dst}})
+    if not res["OK"]:
+      self.report(lfn, "register replica: %s" % res["Message"])
+    elif lfn not in res["Value"]["Successful"]:
+      self.report(lfn, "register replica: %s" % res["Value"]["Failed"].get(lfn))
+    else:
+      self.report(lfn, "", size, start, end)
+
+class GFAL2TransferWorker(BatchTransferWorker):
+  """
+  copy the files with gfal2 inside the agent process,
+  with parallel streams and checksum verification.
+  The copy runs in a thread, and its results are read
+  from a pipe like the output of the other workers.
+  """
+
+  MAX_BATCH = 100
+  # parallel streams of one copy
+  NBSTREAMS = 4
+  # timeout of one copy, in seconds
+  TIMEOUT = 3600
+
+  def __init__(self):
+    super(GFAL2TransferWorker, self).__init__()
+    self.markers = {}
+
+  def create_popen(self, info):
+    gLogger.info("The info to create a gfal2 transfer:")
+    gLogger.info(info)
+
+    self._info = info
+    self._results = {}
+    self._partial = {}
+    r, w = os.pipe()
+    self._streams = [os.fdopen(r)]
+    self._proc = GFAL2Copy(info, w, self.NBSTREAMS, self.TIMEOUT, self.markers)
+    self._proc.start()
+
+  def build_cmd(self, info):
+    return None
+
+if __name__ == "__main__":
+
+  import DIRAC
+  from DIRAC.Core.Base import Script
+  Script.parseCommandLine( ignoreErrors = True )
+
+  dtw = GFAL2TransferWorker()
+  info = {"files": [{"id": 1, "LFN": "/users/l/lintao/README_IHEPD"}],
+          "srcSE": "IHEP-USER",
+          "dstSE": "JINR-USER"}
+  dtw.create_popen(info)
+
+  returncode = dtw.get_retcode()
+  while returncode is None:
+    dtw.handle_waiting()
+    returncode = dtw.get_retcode()
+  else:
+    dtw.drain()
+    print dtw.file_errors(returncode)
+    print dtw.file_stats()
+
+  print "Work Done."
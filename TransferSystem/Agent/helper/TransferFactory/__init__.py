@@ -3,19 +3,65 @@
 # author: lintao
 
 import subprocess
+import sys
 
 import DIRAC
 from DIRAC import gLogger
 
 class TransferFactory(object):
-  PROTOCOL = ["DIRACFTS", "DIRACDMS"]
+  PROTOCOL = ["DIRACFTS", "DIRACDMS", "GFAL2"]
+  MODULE = "IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.TransferBy%s"
+
+  def __init__(self):
+    # registry of the loaded worker classes, {protocol: class}
+    self._workers = {}
+    # the protocols whose class is given by register, they are not reloaded
+    self._registered = set()
+
+  def preload(self, protocols=None):
+    """ load the worker classes at startup, default all in PROTOCOL """
+    for protocol in protocols or self.PROTOCOL:
+      self.load(protocol)
+    return self._workers.keys()
+
+  def reload(self, protocol=None):
+    """
+    reload the module of protocol, or of all the loaded protocols,
+    so the changed worker classes are used by the new workers.
+    """
+    if protocol is None:
+      protocols = self._workers.keys()
+    else:
+      protocols = [protocol]
+    for protocol in protocols:
+      if protocol in self._registered:
+        continue
+      self._workers.pop(protocol, None)
+      mod = sys.modules.get(self.MODULE % protocol)
+      if mod is not None:
+        try:
+          reload(mod)
+        except Exception as e:
+          gLogger.error('Reload transfer protocol "%s" error: %s' % (protocol, e))
+      self.load(protocol)
+
+  def register(self, protocol, TR):
+    """ use the worker class TR for protocol, e.g. a class outside
+        of this package """
+    self._workers[protocol] = TR
+    self._registered.add(protocol)
+
+  def load(self, protocol):
+    """ the worker class of the protocol, None if it can not be loaded """
+    TR = self._workers.get(protocol)
+    if TR is not None:
+      return TR
 
-  def generate(self, protocol, info):
     gLogger.info("Load Module:")
-    gLogger.info("IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.TransferBy%s"%(protocol))
+    gLogger.info(self.MODULE%(protocol))
 
     try:
-      mod = __import__("IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.TransferBy%s"%(protocol),
+      mod = __import__(self.MODULE%(protocol),
           globals(),
           locals(),
           ["%sTransferWorker"%(protocol)]
@@ -25,6 +71,14 @@ class TransferFactory(object):
       gLogger.error('Load transfer protocol "%s" error: %s' % (protocol, e))
       return None
 
+    self._workers[protocol] = TR
+    return TR
+
+  def generate(self, protocol, info):
+    TR = self.load(protocol)
+    if TR is None:
+      return None
+
     tr = TR()
     tr.create_popen(info)
     return tr
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import select
+import time
+
+from DIRAC import gLogger
+
+class WorkerManager(object):
+  """
+  Keep the running transfer workers.
+    * wait on the output of all the workers together, and return
+      as soon as one of them exits.
+    * limit the number of workers, in total and per link (srcSE, dstSE).
+  """
+
+  # when a worker has closed its streams but is not exited yet,
+  # check the processes this often
+  POLL_INTERVAL = 0.1
+
+  def __init__(self, max_transfer, max_transfer_per_link=None, link_limits=None):
+    """
+    max_transfer_per_link: default limit of a link, None means no limit
+    link_limits: {(srcSE, dstSE): limit}, overrides the default
+    """
+    self.max_transfer = max_transfer
+    self.max_transfer_per_link = max_transfer_per_link
+    self.link_limits = link_limits or {}
+    self.workers = []
+
+  @staticmethod
+  def parse_link_limits(options, convert=int):
+    """
+    >>> WorkerManager.parse_link_limits(["IHEP-USER:JINR-USER:4"])
+    {('IHEP-USER', 'JINR-USER'): 4}
+    """
+    link_limits = {}
+    for option in options:
+      try:
+        srcSE, dstSE, limit = [x.strip() for x in option.split(":")]
+        link_limits[(srcSE, dstSE)] = convert(limit)
+      except ValueError:
+        gLogger.error("Wrong link limit (should be srcSE:dstSE:N): ", option)
+    return link_limits
+
+  def link_of(self, worker):
+    return (worker.info["srcSE"], worker.info["dstSE"])
+
+  def free_slots(self):
+    return max(0, self.max_transfer - len(self.workers))
+
+  def link_limit(self, link):
+    return self.link_limits.get(link, self.max_transfer_per_link)
+
+  def running(self, link):
+    """ the number of workers on link """
+    return len([w for w in self.workers if self.link_of(w) == link])
+
+  def link_free_slots(self, link):
+    """ the number of workers which can still be added on link """
+    free = self.free_slots()
+    limit = self.link_limit(link)
+    if limit is None:
+      return free
+    return max(0, min(free, limit - self.running(link)))
+
+  def add(self, worker):
+    self.workers.append(worker)
+
+  def remove(self, worker):
+    self.workers.remove(worker)
+
+  def wait(self, timeout):
+    """
+    wait until a worker exits, or timeout seconds.
+    The output of all the workers is read meanwhile.
+    return the exited workers.
+    """
+    deadline = time.time() + timeout
+    while True:
+      finished = [w for w in self.workers if w.get_retcode() is not None]
+      remaining = deadline - time.time()
+      if finished or remaining <= 0:
+        return finished
+
+      streams = {}
+      closed = False
+      for worker in self.workers:
+        if not worker.streams():
+          closed = True
+        for stream in worker.streams():
+          streams[stream] = worker
+      # a process closes its streams when it exits, so that wakes up select.
+      # but a worker whose streams are already closed must be polled.
+      timeout = remaining
+      if closed:
+        timeout = min(timeout, self.POLL_INTERVAL)
+      if not streams:
+        time.sleep(timeout)
+        continue
+      r, w, x = select.select(streams.keys(), [], [], timeout)
+      for stream in r:
+        streams[stream].handle_read(stream)
@@ -1,187 +1,300 @@
 # -*- coding: utf-8 -*-
 
 import datetime
-import random
+import time
+import uuid
 
 from DIRAC import gLogger, gConfig, S_OK, S_ERROR
 from DIRAC.Resources.Catalog.FileCatalog import FileCatalog
 
 from IHEPDIRAC.TransferSystem.DB.TransferDB import TransRequestEntryWithID
 from IHEPDIRAC.TransferSystem.DB.TransferDB import TransFileListEntryWithID
+from IHEPDIRAC.TransferSystem.DB.TransferDB import FilesInDatasetEntryWithID
 
 from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory import gTransferFactory
 
-from IHEPDIRAC.AccountingSystem.Client.Types.DataTransfer import DataTransfer
-
 class helper_TransferAgent(object):
 
-  def __init__(self, transferAgent, gTransferDB):
+  # max LFNs in one getFileSize call of the catalog
+  SIZE_CHUNK = 1000
+
+  def __init__(self, transferAgent, gTransferDB, accounting=None):
+    """ accounting is an AccountingBuffer, the records of the
+        finished workers are added to it """
     self.transferAgent =transferAgent
     self.transferDB = gTransferDB
+    self.accounting = accounting
     gLogger.info("Creating File Catalog")
     self.fileCatalog = FileCatalog()
 
-  def helper_add_transfer(self, result):
-    if not result:
-      gLogger.error("There is no infomation")
-      return False
-
+  def helper_add_transfers(self, results, batch_size=1, link_free_slots=None):
+    """
+      start the workers for the claimed files.
+      The files of each request are transferred in batches,
+      up to batch_size files (and MAX_BATCH of the protocol) per worker,
+      so the workers of a request are as many as the scheduler gave it.
+      link_free_slots(link) gives how many workers can still be started
+      on the link (srcSE, dstSE).
+      The files which are not started are given back (*new* again).
+      return the number of added workers
+    """
+    if not results:
+      return 0
     res = self.transferDB.get_TransferRequest(condDict={
-                                                      "id": result.trans_req_id
+                                                      "id": list(set(r.trans_req_id for r in results))
                                                       })
     if not res["OK"]:
+      gLogger.error(res)
+      self.transferDB.unclaim_TransferFileList([r.id for r in results])
+      return 0
+    reqs = dict((req.id, req) for req in map(TransRequestEntryWithID._make, res["Value"]))
+
+    groups = {}
+    unclaimed = []
+    for result in results:
+      req = reqs.get(result.trans_req_id)
+      if req is None:
+        unclaimed.append(result)
+        continue
+      groups.setdefault(req.id, []).append((req, result))
+
+    added = 0
+    for reqid, files in groups.items():
+      req = files[0][0]
+      TR = gTransferFactory.load(req.protocol)
+      if TR is None:
+        unclaimed.extend(result for req, result in files)
+        continue
+      size = max(1, min(batch_size, TR.MAX_BATCH))
+      for i in range(0, len(files), size):
+        batch = [result for req, result in files[i:i+size]]
+        if link_free_slots and link_free_slots((req.srcSE, req.dstSE)) <= 0:
+          unclaimed.extend(batch)
+        elif self.helper_add_transfer(req, batch):
+          added += 1
+        else:
+          unclaimed.extend(batch)
+    if unclaimed:
+      self.transferDB.unclaim_TransferFileList([r.id for r in unclaimed])
+    return added
+
+  def helper_add_transfer(self, req, results):
+    """
+      start one worker for the files (TransFileListEntryWithID)
+      of req.
+      the files are already *transfer*, they were claimed by helper_get_new_files
+    """
+    if not results:
+      gLogger.error("There is no infomation")
       return False
-    req_list = res["Value"]
-    if len(req_list) != 1:
-      return False
-    req =  TransRequestEntryWithID._make(req_list[0])
 
     # construct the info
-    info = {"id": result.id,
-            "LFN": result.LFN,
+    info = {"files": [{"id": result.id, "LFN": result.LFN} for result in results],
+            "done": [],
+            "username": req.username,
             "srcSE": req.srcSE,
             "dstSE": req.dstSE,
-            "retransfer": -1,
-            "error": ""}
+            "retransfer": -1}
     # Add the Transfer
     worker = gTransferFactory.generate(req.protocol, info)
     if worker is None:
-      return True
+      return False
     self.transferAgent.transfer_worker.append(worker)
-    # Change the status
-    self.helper_status_update(
-        self.transferDB.tables["TransferFileList"],
-        result.id,
-        {"status":"transfer", 
-          "start_time":datetime.datetime.utcnow()})
-    # Add Accounting:
-    d = {}
-    d["User"] = req.username
-    d["Source"] = req.srcSE
-    d["Destination"] = req.dstSE
-    d["Protocol"] = req.protocol
-    d["FinalStatus"] = "OK"
-    d["TransferSize"] = 0 # TODO
-    r = self.fileCatalog.getFileSize(result.LFN)
-    if r["OK"]:
-      if r["Value"]["Successful"]:
-        d["TransferSize"] = r["Value"]["Successful"][result.LFN]
-    d["TransferTime"] = 1 # 1s 
-    d["TransferOK"] = 1
-    d["TransferTotal"] = 1
-    acct_dt = DataTransfer()
-    acct_dt.setValuesFromDict(d)
-    acct_dt.setNowAsStartAndEndTime()
-    # save it 
-    worker.acct_dt = acct_dt
+    # the sizes and the start time are used by the accounting
+    # and to measure the link rate.
+    # the sizes are loaded with the request, see helper_load_new_request
+    worker.file_sizes = dict((result.LFN, result.size) for result in results
+                                if result.size is not None)
+    unknown = [result.LFN for result in results if result.size is None]
+    if unknown:
+      worker.file_sizes.update(self.helper_get_file_sizes(unknown))
+    worker.start_time = time.time()
+    worker.acct = {"User": req.username,
+                   "Source": req.srcSE,
+                   "Destination": req.dstSE,
+                   "Protocol": req.protocol}
 
     return True
 
+  def helper_finish_files(self, files):
+    """ the files become *finish*, unless they are killed meanwhile """
+    if not files:
+      return
+    gLogger.info("File.id = %s -> finish" % [f["id"] for f in files])
+    res = self.transferDB.updateFields(
+                              self.transferDB.tables["TransferFileList"],
+                              updateDict = {"status":"finish",
+                                            "finish_time": datetime.datetime.utcnow()},
+                              condDict = {"id": [f["id"] for f in files],
+                                          "status": "transfer"},
+                              )
+    if not res["OK"]:
+      gLogger.error(res)
+
   def helper_remove_transfer(self, worker):
     info = worker.info
-    gLogger.info("File.id = %d -> finish" % info["id"])
-    self.helper_status_update(
-        self.transferDB.tables["TransferFileList"],
-        info["id"],
-        {"status":"finish", 
-          "finish_time": datetime.datetime.utcnow()})
-    # Accounting
-    acct_dt = worker.acct_dt
-    acct_dt.setEndTime()
-    # TODO
-    d = {}
-    td = acct_dt.endTime-acct_dt.startTime
-    td_s = (td.microseconds + (td.seconds + td.days * 24 * 3600) * 10**6) / 10**6
-    d["TransferTime"] = td_s # 1s 
-    if info["error"]:
+    self.helper_finish_files(worker.files)
+    # Accounting, the record is sent later with the others
+    # the files of all the rounds, a file with an error failed or was
+    # killed, in the last round or before a retransfer
+    files = info["done"] + worker.files
+    failed = len([f for f in files if f.get("error")])
+    # the bytes reported for each file by the worker, else the size in
+    # the catalog. the time is the span from the first start to the last
+    # end of the files, they are copied in parallel by FTS and GFAL2,
+    # else the life of the worker
+    stats = worker.file_stats()
+    start = worker.start_time
+    end = time.time()
+    if stats:
+      start = min(s for size, s, e in stats.values())
+      end = max(e for size, s, e in stats.values())
+    size = 0
+    for f in files:
+      if f.get("error"):
+        continue
+      if f["id"] in stats:
+        size += stats[f["id"]][0]
+      else:
+        size += worker.file_sizes.get(f["LFN"], 0)
+    d = dict(worker.acct)
+    d["TransferSize"] = size
+    d["TransferTime"] = end - start
+    d["TransferOK"] = len(files) - failed
+    d["TransferTotal"] = len(files)
+    if failed:
       d["FinalStatus"] = "FAILED"
-      d["TransferOK"] = 0
-    else:  
+    else:
       d["FinalStatus"] = "OK"
-      d["TransferOK"] = 1
-
-    acct_dt.setValuesFromDict(d)
+    if self.accounting is not None:
+      self.accounting.add(d, start, end)
 
-    acct_dt.commit()
-    gLogger.info("Submit Accounting Data")
-    
   def helper_check_request(self):
     """
       check if the *transfer* request are ok.
       if the whole files are *finish*, then this request
       will become *finish*.
+      The files of all the *transfer* requests are counted
+      with one query, see get_TransferFileListStatusCount.
     """
     infoDict = {"status": "transfer"}
     res = self.transferDB.get_TransferRequest(condDict = infoDict)
     if not res["OK"]:
       return
     reqlist = map(TransRequestEntryWithID._make, res["Value"])
+    if not reqlist:
+      return
+    res = self.transferDB.get_TransferFileListStatusCount("transfer")
+    if not res["OK"]:
+      gLogger.error(res)
+      return
+    counts = res["Value"]
+    finished = []
     for req in reqlist:
-      res = self.transferDB._query(
-          'select count(*) from %(table)s where trans_req_id = %(id)d and status not in %(status_list)s' % {
-             "table": self.transferDB.tables["TransferFileList"], 
-             "id": req.id,
-             "status_list": '("finish", "kill")' # XXX finish or kill means this request is ok.
-             }
-          )
-      if not res["OK"]:
-        # TODO
-        continue
-      count = res["Value"][0][0]
+      # XXX finish or kill means this request is ok.
+      count = sum(n for status, n in counts.get(req.id, {}).items()
+                    if status not in ("finish", "kill"))
       if count == 0:
         # if all status is finish,
         # the req status --> finish
         gLogger.info("req.id %d change from %s to finish" % (req.id, req.status))
-        self.helper_status_update(
-            self.transferDB.tables["TransferRequest"],
-            req.id,
-            {"status":"finish"})
+        finished.append(req.id)
+    if finished:
+      self.helper_status_update(
+          self.transferDB.tables["TransferRequest"],
+          finished,
+          {"status":"finish",
+           "finish_time": datetime.datetime.utcnow()})
     return 
 
-  def helper_get_new_request(self):
-    # 1. get the *new* File in the <<Transfer File List>>.
-    #    if we get, goto <<Add New Transfer>>
-    already_load_status = False
-    result_new_file = self.helper_get_new_File()
-    # 1.1 2014.04.20
-    #     They want to the other requests are also loaded,
-    #     so I have to not return immediately
-    if result_new_file:
-      already_load_status = True
-    # 2. if we can't get, use should get a *new* request
-    #    from the <<Transfer Request>>.
-    #    if we can't get, return False. STOP
+  def helper_get_new_files(self, n, scheduler=None, batch_size=1):
+    """
+      get the *new* files for up to n idle workers,
+      up to batch_size files per worker.
+      The files are claimed in the DB, so they are *transfer* now.
+      With a scheduler (LinkScheduler), the workers are shared between
+      the *transfer* requests by priority and weight, per link and user.
+      return a list of TransFileListEntryWithID
+    """
+    # 1. check the *transfer* requests,
+    #    if the whole files are finish, the request is finish.
     self.helper_check_request()
+    # 2. load the file list of a *new* request into the << Transfer File List >>
+    #    2014.04.20
+    #    They want to the other requests are also loaded,
+    #    so it is done even if there are *new* files already.
+    self.helper_load_new_request()
+    # 3. claim the *new* Files.
+    if scheduler is None:
+      return self.helper_get_new_File(n * batch_size)
+    # 3.1 claim the files of each request separately
+    res = self.transferDB.get_TransferRequest(condDict = {"status": "transfer"})
+    if not res["OK"]:
+      gLogger.error(res)
+      return []
+    requests = dict((req.id, req) for req in map(TransRequestEntryWithID._make, res["Value"]))
+    filelist = []
+    pending = {}
+    # a request without enough *new* files gives its workers to the others
+    while n > 0 and requests:
+      allocation = scheduler.allocate(n, requests.values(), pending)
+      if not allocation:
+        break
+      for reqid, workers in allocation.items():
+        files = self.helper_get_new_File(workers * batch_size,
+                                         {"trans_req_id": reqid})
+        filelist.extend(files)
+        used = (len(files) + batch_size - 1) / batch_size
+        pending[reqid] = pending.get(reqid, 0) + used
+        n -= used
+        if used < workers:
+          del requests[reqid]
+    return filelist
+
+  def helper_load_new_request(self):
     result = self.helper_get_new_request_entry()
-    if result:
-      # 3. add the filelist in the dataset to the << Transfer File List >>
-      condDict = {"name":result.dataset}  
-      res = self.transferDB.get_Dataset(condDict)
+    if not result:
+      return
+    # add the filelist in the dataset to the << Transfer File List >>
+    condDict = {"name":result.dataset}
+    res = self.transferDB.get_Dataset(condDict)
+    if not res["OK"]:
+      gLogger.error(res)
+      return
+    filelist = res["Value"]
+    # the files are inserted before the request becomes *transfer*,
+    # if the insert fails the request stays *new* and is loaded again.
+    if filelist:
+      # the sizes of all the files, with a few calls of the catalog
+      sizes = self.helper_get_file_sizes([f.LFN for f in map(FilesInDatasetEntryWithID._make, filelist)])
+      res = self.transferDB.insert_TransferFileList(result.id, filelist, sizes)
       if not res["OK"]:
         gLogger.error(res)
-        return None
-      filelist = res["Value"]
-      # update the status in << Request >>
-      if len(filelist) > 0:
-        req_status = "transfer"
-      else:
-        req_status = "finish"
-      self.helper_status_update(self.transferDB.tables["TransferRequest"],
-                                result.id,
-                                {"status":req_status})
-      self.transferDB.insert_TransferFileList(result.id, filelist)
-    # 4. get the *new* File Again.
-    # 5. can't get, return False. STOP
-    # 4.prelude
-    #    If already loaded, return the last result
-    if already_load_status and result_new_file:
-      return result_new_file
-      
-    result = self.helper_get_new_File()
-    return result
+        return
+    # update the status in << Request >>
+    toUpdate = {"status": "transfer"}
+    if not filelist:
+      toUpdate = {"status": "finish",
+                  "finish_time": datetime.datetime.utcnow()}
+    self.helper_status_update(self.transferDB.tables["TransferRequest"],
+                              result.id,
+                              toUpdate)
+
+  def helper_get_file_sizes(self, lfns):
+    """ return {LFN: size} from the catalog, SIZE_CHUNK LFNs per call.
+        the files whose size is unknown are missing """
+    sizes = {}
+    for i in range(0, len(lfns), self.SIZE_CHUNK):
+      res = self.fileCatalog.getFileSize(lfns[i:i+self.SIZE_CHUNK])
+      if not res["OK"]:
+        gLogger.error("get file size error: ", res["Message"])
+        continue
+      sizes.update(res["Value"]["Successful"])
+    return sizes
 
   def helper_get_new_request_entry(self):
     """
+    the *new* request with the highest priority, the oldest first.
     TransRequestEntryWithID(
       id=1L, 
       username='lintao', 
@@ -189,48 +302,44 @@ class helper_TransferAgent(object):
       srcSE='IHEP-USER', 
       dstSE='IHEPD-USER', 
       submit_time=datetime.datetime(2013, 3, 13, 20, 9, 34), 
-      status='new')
+      status='new',
+      priority=0,
+      weight=1)
     """
     condDict = {"status": "new"}
-    res = self.transferDB.get_TransferRequest(condDict)
+    res = self.transferDB.get_TransferRequestWithLimit(condDict,
+                                                       ["priority:DESC", "id:ASC"],
+                                                       0, 1)
     if not res["OK"]:
       return None
     req_list = res["Value"]
-    len_req = len(req_list)
-    if len_req:
-      # random select
-      tmp_idx = random.randint(0, len_req-1)
-      return TransRequestEntryWithID._make(req_list[tmp_idx])
-    pass
+    if req_list:
+      return TransRequestEntryWithID._make(req_list[0])
 
-  def helper_get_new_File(self):
+  def helper_get_new_File(self, n=1, condDict=None):
     """
+    claim up to n *new* files with one UPDATE, see claim_TransferFileList.
+    condDict can restrict the files, e.g. {"trans_req_id": [1, 2]}
     >>> helper.helper_get_new_File()
-    TransFileListEntryWithID(
+    [TransFileListEntryWithID(
       id=1L, 
       LFN='/path/does/not/exist', 
       trans_req_id=1L, 
-      start_time=None, 
+      start_time=datetime.datetime(2013, 3, 13, 20, 9, 34),
       finish_time=None, 
-      status='new')
+      status='transfer')]
     """
-    condDict = {"status": "new"}
-    res = self.transferDB.get_TransferFileList(condDict)
+    token = uuid.uuid4().hex
+    res = self.transferDB.claim_TransferFileList(n, token, condDict)
     if not res["OK"]:
       gLogger.error(res)
-      return None
-    filelist = res["Value"]
-    gLogger.info("Filelist:")
-    gLogger.info(filelist)
-    len_files = len(filelist)
-    if  len_files > 0:
-      tmp_idx = random.randint(0, len_files-1)
-      gLogger.info("get file entry index randomly: %d/%d"%(tmp_idx, len_files))
-      gLogger.info("get file entry", filelist[tmp_idx])
-      return TransFileListEntryWithID._make(filelist[tmp_idx])
-    return None
+      return []
+    filelist = map(TransFileListEntryWithID._make, res["Value"])
+    gLogger.info("claim %d/%d new files, token %s" % (len(filelist), n, token))
+    return filelist
 
   def helper_status_update(self, table, id, toUpdate):
+    """ id can also be a list of ids """
     res = self.transferDB.updateFields(
                               table,
                               updateDict = toUpdate,
@@ -238,31 +347,42 @@ class helper_TransferAgent(object):
                               )
     print res
 
-  def helper_error_report(self, worker, reason):
-    self.helper_status_update(self.transferDB.tables["TransferFileList"],
-                              worker.info["id"],
-                              {"error": reason})
+  def helper_error_report(self, worker, files):
+    """ save the error of each failed file """
+    for f in files:
+      self.helper_status_update(self.transferDB.tables["TransferFileList"],
+                                f["id"],
+                                {"error": f["error"]})
 
-  def check_worker_status(self, worker):
-    """check whether the file transfer is kill(in DB)"""
+  def check_workers_status(self, workers):
+    """
+      check whether the files of the workers are kill(in DB),
+      with one query for all the running files.
+    """
+    files = {}
+    for worker in workers:
+      for f in worker.files:
+        files[f["id"]] = worker
+    if not files:
+      return
     res = self.transferDB.getFields(self.transferDB.tables["TransferFileList"],
-                                    outFields = ["status"],
-                                    condDict = {"id":worker.info["id"]})
+                                    outFields = ["id"],
+                                    condDict = {"id": files.keys(),
+                                                "status": "kill"})
     if not res["OK"]:
       gLogger.error(res)
       return
 
-    if not res["Value"]:
-      return
-
-    if len(res["Value"]) != 1:
-      gLogger.error[res]
-      return 
-
-    status = res["Value"][0][0]
-    if status == "kill":
-      gLogger.info("check worker should be killed: ", status)
-      worker.proc.kill()
+    killed = {}
+    for fileid, in res["Value"]:
+      killed.setdefault(files[fileid], set()).add(fileid)
+    for worker, fileids in killed.items():
+      # one process transfers the whole batch, so it is killed,
+      # the other files of the batch are retransferred.
+      gLogger.info("check worker should be killed: ", list(fileids))
+      worker.info.setdefault("killed", set()).update(fileids)
+      if worker.get_retcode() is None:
+        worker.proc.kill()
 
 if __name__ == "__main__":
   from DIRAC.Core.Base import Script
@@ -273,16 +393,11 @@ if __name__ == "__main__":
   transferAgent = gTransferDB
   transferAgent.transfer_worker = []
   helper = helper_TransferAgent(transferAgent, gTransferDB)
-  entry = helper.helper_get_new_File()
   print helper.helper_get_new_request_entry()
-
-  if entry:
-    print helper.helper_status_update( table = "TransferFileList", 
-                                       id = entry.id,
-                                       toStatus = {"status":"transfer"})
+  entries = helper.helper_get_new_files(1)
 
   print helper.helper_check_request()
-  print helper.helper_add_transfer(entry)
+  print helper.helper_add_transfers(entries)
   print transferAgent.transfer_worker
 
   pass
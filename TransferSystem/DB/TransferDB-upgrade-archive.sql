@@ -0,0 +1,44 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-archive.sql
+--
+-- 2026.10.19
+-- the files of the requests finished for a while are moved from
+-- TransferFileList to TransferFileListArchive by the TransferArchiveAgent,
+-- a summary of each request is kept in TransferRequestSummary.
+
+alter table TransferRequest
+  add column finish_time datetime default null after weight,
+  add index (finish_time);
+
+-- the finished requests: when their last file finished
+update TransferRequest r
+  set finish_time = coalesce((select max(f.finish_time) from TransferFileList f
+                                where f.trans_req_id = r.id and f.status = 'finish'),
+                             r.submit_time)
+  where r.status = 'finish';
+
+create table TransferFileListArchive (
+  id int not null primary key,
+  LFN varchar(255) not null,
+  trans_req_id int not null,
+  start_time datetime,
+  finish_time datetime,
+  status enum('new', 'transfer', 'finish', 'kill') not null,
+  error mediumtext,
+  claim_token varchar(64) default null,
+  size bigint unsigned default null,
+  index(trans_req_id)
+) ENGINE=InnoDB;
+
+create table TransferRequestSummary (
+  trans_req_id int not null primary key,
+  files int not null,
+  ok int not null,
+  failed int not null,
+  killed int not null,
+  size bigint unsigned,
+  start_time datetime,
+  finish_time datetime,
+  archive_time datetime not null,
+  foreign key (trans_req_id) references TransferRequest (id)
+) ENGINE=InnoDB;
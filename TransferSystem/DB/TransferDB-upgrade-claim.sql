@@ -0,0 +1,9 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-claim.sql
+--
+-- 2026.10.19
+-- the agent claims new files with a token, see claim_TransferFileList.
+
+alter table TransferFileList
+  add column claim_token varchar(64) default null after error,
+  add index(claim_token);
@@ -0,0 +1,12 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-file-count.sql
+--
+-- 2026.10.19
+-- the number of files of a dataset is kept in Dataset by insert_Dataset,
+-- so the pages of the file list do not count the files again.
+
+alter table Dataset
+  add column file_count int not null default 0 after username;
+
+update Dataset d
+  set file_count = (select count(*) from FilesInDataSet f where f.dataset_id = d.id);
@@ -0,0 +1,34 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-indexes.sql
+--
+-- 2026.10.19
+-- add the indexes of TransferDB.sql to an existing database.
+
+-- TransferFileList: files of a request by status,
+-- e.g. trans_req_id = X and status not in ('finish', 'kill')
+alter table TransferFileList
+  add index TransReqStatus (trans_req_id, status);
+
+-- FilesInDataSet: a LFN is only once in a dataset.
+-- the key is on SHA1(LFN): a key on (dataset_id, LFN) in utf8 is 769 bytes,
+-- more than the 767 bytes of InnoDB with the COMPACT row format
+-- (MySQL < 5.7.7).
+-- the index on (dataset_id, LFN_hash) is added with the column, not
+-- unique yet, so the removal of the duplicated rows below does not
+-- join the whole table with itself.
+alter table FilesInDataSet
+  add column LFN_hash char(40) character set ascii not null default '' after dataset_id,
+  add index DatasetLFNHash (dataset_id, LFN_hash);
+
+update FilesInDataSet set LFN_hash = SHA1(LFN);
+
+-- remove the duplicated rows first, keep the oldest one.
+delete f1 from FilesInDataSet f1
+  join FilesInDataSet f2
+    on f1.dataset_id = f2.dataset_id and f1.LFN_hash = f2.LFN_hash
+       and f1.LFN = f2.LFN and f1.id > f2.id;
+
+alter table FilesInDataSet
+  alter column LFN_hash drop default,
+  add unique key DatasetLFN (dataset_id, LFN_hash),
+  drop index DatasetLFNHash;
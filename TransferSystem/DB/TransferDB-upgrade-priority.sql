@@ -0,0 +1,11 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-priority.sql
+--
+-- 2026.10.19
+-- the priority and the weight of a request, the agent shares
+-- the workers between the requests and the users with them.
+-- the existing requests get the default priority and weight.
+
+alter table TransferRequest
+  add column priority int not null default 0 after status,
+  add column weight int not null default 1 after priority;
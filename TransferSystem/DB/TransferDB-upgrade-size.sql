@@ -0,0 +1,9 @@
+-- usage:
+--   $ mysql -u Dirac -pXXX --database=TransferDB < TransferDB-upgrade-size.sql
+--
+-- 2026.10.19
+-- the size of a file is read from the catalog once, when its request
+-- is loaded, see helper_load_new_request.
+
+alter table TransferFileList
+  add column size bigint unsigned default null after claim_token;
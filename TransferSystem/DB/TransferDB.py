@@ -7,6 +7,7 @@ from DIRAC.Core.Utilities.MySQL import _quotedList
 # Some basic arguments will use namedtuple 
 from collections import namedtuple
 import datetime
+import hashlib
 
 TransRequestEntry = namedtuple('TransRequestEntry',
                               [#'id',
@@ -17,6 +18,11 @@ TransRequestEntry = namedtuple('TransRequestEntry',
                                'protocol',
                                'submit_time',
                                'status',
+                               # the higher priority requests get the workers first,
+                               # the requests of the same priority share them
+                               # in proportion to weight, see LinkScheduler
+                               'priority',
+                               'weight',
                                ])
 TransRequestEntryWithID = namedtuple('TransRequestEntryWithID',
                                       ('id',) + TransRequestEntry._fields)
@@ -28,6 +34,7 @@ TransFileListEntry = namedtuple('TransFileListEntry',
                                  'finish_time',
                                  'status',
                                  'error',
+                                 'size',
                                  ])
 TransFileListEntryWithID = namedtuple('TransFileListEntryWithID',
                                       ('id',) + TransFileListEntry._fields)
@@ -46,13 +53,31 @@ FilesInDatasetEntry = namedtuple('FilesInDatasetEntry',
                                   ])
 FilesInDatasetEntryWithID = namedtuple('FilesInDatasetEntryWithID',
                                 ('id',) + FilesInDatasetEntry._fields)
+# what is left of a request when its files are archived,
+# see archive_TransferFileList
+TransRequestSummaryEntry = namedtuple('TransRequestSummaryEntry',
+                                      ['trans_req_id',
+                                       'files',
+                                       'ok',
+                                       'failed',
+                                       'killed',
+                                       'size',
+                                       'start_time',
+                                       'finish_time',
+                                       'archive_time',
+                                       ])
 
 
 class TransferDB(DB):
   tables = dict(TransferRequest = "TransferRequest",
                 TransferFileList = "TransferFileList",
                 Dataset = "Dataset",
-                FilesInDataSet = "FilesInDataSet")
+                FilesInDataSet = "FilesInDataSet",
+                TransferFileListArchive = "TransferFileListArchive",
+                TransferRequestSummary = "TransferRequestSummary")
+
+  # max rows in one multi-row INSERT statement
+  BULK_INSERT_CHUNK = 1000
 
   def __init__(self, dbname="TransferDB", 
                      fullname="Transfer/TransferDB",
@@ -110,15 +135,7 @@ class TransferDB(DB):
     if not isinstance(entry, TransRequestEntry):
       raise TypeError("entry should be TransRequestEntry")
     infoDict = dict(entry._asdict())
-    res = self.insertFields( self.tables["TransferRequest"],
-                             inDict = infoDict)
-    if not res["OK"]:
-      return res
-    res = self._query("select last_insert_id()")
-    if not res["OK"]:
-      return res
-    id = res['Value'][0][0]
-    return S_OK(id)
+    return self.helper_insert_entry(self.tables["TransferRequest"], infoDict)
 
   def get_TransferRequest(self, condDict = None):
     res = self.getFields( self.tables["TransferRequest"],
@@ -151,19 +168,32 @@ class TransferDB(DB):
                           )
     return res
 
+  def update_TransferRequestPriority(self, id, priority, weight):
+    """ change the priority and the weight of the request id,
+        the agent uses them from its next cycle """
+    res = self.updateFields( self.tables["TransferRequest"],
+                             updateDict = {"priority": priority,
+                                           "weight": weight},
+                             condDict = {"id": id},
+                             )
+    return res
+
   def insert_PerTransferFile(self, entry):
     if not isinstance(entry, TransFileListEntry):
       raise TypeError("entry should be TransFileListEntry")
     infoDict = dict(entry._asdict())
-    res = self.insertFields( self.tables["TransferFileList"],
-                             inDict = infoDict)
-    if not res["OK"]:
-      return res
-    res = self._query("select last_insert_id()")
-    return res
+    return self.helper_insert_entry(self.tables["TransferFileList"], infoDict)
 
-  def insert_TransferFileList(self, trans_req_id, filelist):
+  def insert_TransferFileList(self, trans_req_id, filelist, sizes = None):
+    """ filelist is the rows of FilesInDataSet (see get_Dataset).
+        sizes is {LFN: size} of the files, if they are known.
+        all the files are inserted in one transaction.
+        return S_OK(the number of inserted files)
+    """
+    if sizes is None:
+      sizes = {}
     # << get list of files for the dataset >>
+    entries = []
     for dsfile in map(FilesInDatasetEntryWithID._make, filelist):
       entry = TransFileListEntry(LFN = dsfile.LFN,
                                  trans_req_id = trans_req_id,
@@ -171,8 +201,12 @@ class TransferDB(DB):
                                  finish_time = '0000-00-00',
                                  status = "new",
                                  error = "",
+                                 size = sizes.get(dsfile.LFN),
                                  )
-      self.insert_PerTransferFile(entry)
+      entries.append(entry)
+    return self.helper_bulk_insert(self.tables["TransferFileList"],
+                                   TransFileListEntry._fields,
+                                   entries)
 
   def get_TransferFileList(self, condDict = None):
     res = self.getFields( self.tables["TransferFileList"], 
@@ -181,29 +215,291 @@ class TransferDB(DB):
                            )
     return res
 
-  def delete_TransferFileListByReq(self, condDict = None):
+  def get_TransferFileListTotal(self, condDict = None):
+    res_total = self.countEntries(self.tables["TransferFileList"],
+                                  condDict=condDict)
+    return res_total
+
+  def get_TransferFileListWithLimit(self, condDict = None, offset = None, limit = 1000,
+                                    lastId = None, withError = True):
+    """ one page of get_TransferFileList, ordered by id.
+        condDict can filter the status, e.g. {"status": ["kill", "finish"]}
+
+        >>> lastId = 1000 # keyset: the files after id 1000,
+                          # pass the id of the last row to get the next page
+        or
+        >>> offset = 100 # begin, for the pages of the web grid
+
+        withError = False leaves out the error text, the error column is
+        then "error" if the file has an error, else "".
     """
-    condDict = {"trans_req_id": int(transid)}
+    errorField = "error"
+    if not withError:
+      errorField = "CASE WHEN error IS NULL OR error = '' THEN '' ELSE 'error' END"
+    outFields = ", ".join(errorField if field == "error" else field
+                            for field in TransFileListEntryWithID._fields)
+    try:
+      condition = self.buildCondition( condDict = condDict )
+    except Exception, x:
+      return S_ERROR( x )
+    if lastId is not None:
+      if condition.strip():
+        condition += " AND id > %d" % int(lastId)
+      else:
+        condition = "WHERE id > %d" % int(lastId)
+    condition += " ORDER BY id LIMIT %d" % int(limit)
+    if offset:
+      condition += " OFFSET %d" % int(offset)
+    return self._query( "SELECT %s FROM %s %s" % ( outFields,
+                                                   self.tables["TransferFileList"],
+                                                   condition ) )
+
+  def get_TransferFileListStatusCount(self, req_status = "transfer"):
+    """ count the files of every request in req_status, by file status,
+        with one GROUP BY query.
+        return S_OK({trans_req_id: {file status: count}})
+        a request without files is not in the result.
     """
-    # get the file list in req.
-    res = self.getFields( self.tables["TransferFileList"], 
+    res = self._escapeValues( [req_status] )
+    if not res["OK"]:
+      return res
+    res = self._query( "SELECT f.trans_req_id, f.status, COUNT(*) "
+                       "FROM %(files)s f JOIN %(reqs)s r ON f.trans_req_id = r.id "
+                       "WHERE r.status = %(status)s "
+                       "GROUP BY f.trans_req_id, f.status" % {
+                          "files": self.tables["TransferFileList"],
+                          "reqs": self.tables["TransferRequest"],
+                          "status": res["Value"][0] } )
+    if not res["OK"]:
+      return res
+    counts = {}
+    for trans_req_id, status, count in res["Value"]:
+      counts.setdefault(trans_req_id, {})[status] = count
+    return S_OK(counts)
+
+  def claim_TransferFileList(self, limit, token, condDict = None):
+    """ atomically change up to limit *new* files to *transfer* and return
+        them as the rows of get_TransferFileList.
+        the files are marked with token (it should be unique, e.g. uuid)
+        in one UPDATE, so two agents never get the same file.
+
+        condDict can restrict the files, e.g. {"trans_req_id": 1}
+    """
+    if condDict is None:
+      condDict = {}
+    condDict = dict(condDict)
+    condDict["status"] = "new"
+    res = self._escapeValues( [token] )
+    if not res["OK"]:
+      return res
+    quotedToken = res["Value"][0]
+    try:
+      condition = self.buildCondition( condDict = condDict,
+                                       orderAttribute = "id",
+                                       limit = limit )
+    except Exception, x:
+      return S_ERROR( x )
+    res = self._update( "UPDATE %s SET status = 'transfer', claim_token = %s, "
+                        "start_time = UTC_TIMESTAMP() %s" % ( self.tables["TransferFileList"],
+                                                              quotedToken,
+                                                              condition ) )
+    if not res["OK"]:
+      return res
+    if not res["Value"]:
+      return S_OK( () )
+    return self.getFields( self.tables["TransferFileList"],
                            outFields = TransFileListEntryWithID._fields,
-                           condDict = condDict,
+                           condDict = {"claim_token": token,
+                                       "status": "transfer"},
                            )
+
+  def unclaim_TransferFileList(self, fileid):
+    """ give claimed files back, they become *new* again,
+        without the start_time of the claim.
+        fileid can also be a list of ids """
+    if not isinstance(fileid, (list, tuple)):
+      fileid = [fileid]
+    if not fileid:
+      return S_OK(0)
+    res = self._update( "UPDATE %s SET status = 'new', claim_token = NULL, start_time = NULL "
+                        "WHERE id IN (%s) AND status = 'transfer'" % ( self.tables["TransferFileList"],
+                                                                       ", ".join(str(int(i)) for i in fileid) ) )
+    return res
+
+  def delete_TransferFileListByReq(self, condDict = None):
+    """
+    condDict = {"trans_req_id": int(transid)}
+    """
+    # kill them with one UPDATE, see kill_TransferFileList
+    return self.kill_TransferFileList(condDict)
+
+  def kill_TransferFileList(self, condDict):
+    """ kill all the *new* and *transfer* files of condDict
+        with one UPDATE.
+        condDict = {"trans_req_id": 1} or {"id": [154, 155]}
+        return S_OK(number of killed files)
+    """
+    return self.helper_update_files(condDict, ["new", "transfer"],
+                                    "status = 'kill'")
+
+  def requeue_TransferFileList(self, condDict, failedOnly = False):
+    """ make all the *finish* and *kill* files of condDict *new* again
+        with one UPDATE, the agent transfers them again.
+        condDict = {"trans_req_id": 1} or {"id": [154, 155]}
+        failedOnly: only the killed files and the files with an error.
+        Their requests become *transfer*.
+        return S_OK(number of requeued files)
+    """
+    extra = ""
+    if failedOnly:
+      extra = "(status = 'kill' OR error != '')"
+    res = self.helper_update_files(condDict, ["finish", "kill"],
+                                   "status = 'new', error = '', claim_token = NULL, "
+                                   "start_time = NULL, finish_time = NULL",
+                                   extra)
+    if not res["OK"] or not res["Value"]:
+      return res
+    count = res["Value"]
+    # the requests of the files
+    if "trans_req_id" in condDict:
+      reqids = condDict["trans_req_id"]
+    else:
+      res = self._query( "SELECT DISTINCT trans_req_id FROM %s WHERE id IN (%s)"
+                         % ( self.tables["TransferFileList"],
+                             ", ".join(str(int(i)) for i in self.helper_id_list(condDict["id"])) ) )
+      if not res["OK"]:
+        return res
+      reqids = [row[0] for row in res["Value"]]
+    res = self.updateFields(
+                self.tables["TransferRequest"],
+                updateDict = {"status": "transfer"},
+                condDict = {"id": reqids}
+                )
     if not res["OK"]:
-      gLogger.error(res)
       return res
+    return S_OK(count)
 
-    if not res["Value"]:
-      gLogger.error(res)
+  def get_ArchivableRequests(self, days, limit):
+    """ the ids of the *finish* requests finished more than days ago
+        whose files are still in TransferFileList, the oldest first.
+        return S_OK([trans_req_id, ...])
+    """
+    res = self._query( "SELECT r.id FROM %(reqs)s r "
+                       "WHERE r.status = 'finish' "
+                       "AND r.finish_time < DATE_SUB(UTC_TIMESTAMP(), INTERVAL %(days)d DAY) "
+                       "AND EXISTS (SELECT 1 FROM %(files)s f WHERE f.trans_req_id = r.id) "
+                       "ORDER BY r.finish_time LIMIT %(limit)d" % {
+                          "reqs": self.tables["TransferRequest"],
+                          "files": self.tables["TransferFileList"],
+                          "days": int(days),
+                          "limit": int(limit) } )
+    if not res["OK"]:
+      return res
+    return S_OK([row[0] for row in res["Value"]])
+
+  def archive_TransferFileList(self, trans_req_id, batch = 1000, limit = None):
+    """ move the files of the request trans_req_id from TransferFileList
+        to TransferFileListArchive, batch files per transaction,
+        up to limit files (None is all of them).
+        Before its first files are moved, the summary of the request
+        is saved in TransferRequestSummary, so it is kept if a later
+        batch fails, and the next call goes on with the rest.
+        The copy skips the files which are in the archive already,
+        so a batch copied but not deleted is deleted by the next call.
+        return S_OK(number of moved files)
+    """
+    trans_req_id = int(trans_req_id)
+    fields = ", ".join(TransFileListEntryWithID._fields)
+    res = self._query( "SELECT COUNT(*) FROM %s WHERE trans_req_id = %d"
+                       % ( self.tables["TransferRequestSummary"], trans_req_id ) )
+    if not res["OK"]:
       return res
+    summary = []
+    if not res["Value"][0][0]:
+      summary = [ "INSERT INTO %(summary)s (%(summaryFields)s) "
+                  "SELECT trans_req_id, COUNT(*), "
+                  "SUM(status = 'finish' AND COALESCE(error, '') = ''), "
+                  "SUM(status = 'finish' AND COALESCE(error, '') != ''), "
+                  "SUM(status = 'kill'), "
+                  "SUM(CASE WHEN status = 'finish' AND COALESCE(error, '') = '' THEN size ELSE 0 END), "
+                  "MIN(CASE WHEN status = 'finish' THEN start_time END), "
+                  "MAX(CASE WHEN status = 'finish' THEN finish_time END), "
+                  "UTC_TIMESTAMP() "
+                  "FROM %(files)s WHERE trans_req_id = %(id)d "
+                  "GROUP BY trans_req_id" % {
+                    "summary": self.tables["TransferRequestSummary"],
+                    "summaryFields": ", ".join(TransRequestSummaryEntry._fields),
+                    "files": self.tables["TransferFileList"],
+                    "id": trans_req_id } ]
+    moved = 0
+    while limit is None or moved < limit:
+      size = batch
+      if limit is not None:
+        size = min(batch, limit - moved)
+      # the last id of the batch, the same rows are copied and deleted.
+      # the files requeued meanwhile stay.
+      condition = "WHERE trans_req_id = %d AND status IN ('finish', 'kill')" % trans_req_id
+      res = self._query( "SELECT MAX(id) FROM (SELECT id FROM %s %s "
+                         "ORDER BY id LIMIT %d) f" % ( self.tables["TransferFileList"],
+                                                       condition, size ) )
+      if not res["OK"]:
+        return res
+      last = res["Value"][0][0]
+      if last is None:
+        break
+      condition += " AND id <= %d" % last
+      cmdList = summary + [
+                  "INSERT IGNORE INTO %s (%s) SELECT %s FROM %s %s" % ( self.tables["TransferFileListArchive"],
+                                                                       fields, fields,
+                                                                       self.tables["TransferFileList"],
+                                                                       condition ),
+                  "DELETE FROM %s %s" % ( self.tables["TransferFileList"], condition ) ]
+      res = self.helper_transaction( cmdList )
+      if not res["OK"]:
+        gLogger.error(res)
+        return res
+      summary = []
+      # the number of rows of the last statement, the DELETE
+      moved += int(res["Value"][-1])
+    return S_OK(moved)
+
+  def get_TransferRequestSummary(self, condDict = None):
+    """ the summaries of the archived requests,
+        rows of TransRequestSummaryEntry """
+    return self.getFields( self.tables["TransferRequestSummary"],
+                           outFields = TransRequestSummaryEntry._fields,
+                           condDict = condDict,
+                           )
 
-    # remove these.
+  def helper_id_list(self, ids):
+    if isinstance(ids, (list, tuple)):
+      return ids
+    return [ids]
 
-    for rawentry in res["Value"]:
-      entry = TransFileListEntryWithID._make(rawentry)
-      self.delete_TransferFileList( {"id":entry.id})
-    return S_OK()
+  def helper_update_files(self, condDict, statuses, setClause, extra = ""):
+    """ UPDATE the files of condDict whose status is in statuses.
+        condDict can only select by "trans_req_id" or "id",
+        the values can be lists.
+        return S_OK(number of the changed files)
+    """
+    if not condDict or set(condDict.keys()) - set(["trans_req_id", "id"]):
+      return S_ERROR("condDict should have trans_req_id or id: %s" % condDict)
+    for key, value in condDict.items():
+      if not value and value != 0:
+        return S_OK(0)
+      if not all(str(v).isdigit() for v in self.helper_id_list(value)):
+        return S_ERROR("The type of dict['%s'] should be int" % key)
+    condDict = dict(condDict)
+    condDict["status"] = statuses
+    try:
+      condition = self.buildCondition( condDict = condDict )
+    except Exception, x:
+      return S_ERROR( x )
+    if extra:
+      condition += " AND %s" % extra
+    return self._update( "UPDATE %s SET %s %s" % ( self.tables["TransferFileList"],
+                                                   setClause,
+                                                   condition ) )
 
   def delete_TransferFileList(self, condDict = None):
     """ currently, condDict should be
@@ -304,37 +600,104 @@ class TransferDB(DB):
     return res
 
   def insert_Dataset(self, dataset, user, filelist):
-    # two step:
-    # insert into Dataset table.
-    # insert into Files in Dataset table.
-    entry = DatasetEntry( name = dataset,
-                          username = user,
-                          )
-    res = self.helper_insert_Dataset_table(entry)
+    """ create the dataset with the files in filelist.
+        if the dataset of user exists already, the files are appended,
+        so a create can be sent again, e.g. after a timeout.
+        return S_OK({"dataset_id": id, "inserted": n, "skipped": n})
+    """
+    res = self.get_DatasetInfo( {"name": dataset} )
     if not res["OK"]:
       return res
-    dataset_id = res["Value"]
-
-    for perfile in filelist:
-      entry = FilesInDatasetEntry( dataset_id = dataset_id,
-                                   LFN = perfile)
-      res = self.helper_insert_FilesInDataset_table(entry)
-      if not res["OK"]:
+    if res["Value"]:
+      entry = DatasetEntryWithID._make(res["Value"][0])
+    else:
+      res = self.helper_insert_Dataset_table( DatasetEntry( name = dataset,
+                                                            username = user ) )
+      if res["OK"]:
+        return self.append_Dataset(res["Value"], filelist)
+      # the same dataset may be created meanwhile
+      res2 = self.get_DatasetInfo( {"name": dataset} )
+      if not res2["OK"] or not res2["Value"]:
         return res
-    return S_OK()
-
-  def get_Dataset(self, condDict = None):
-    res = self.get_DatasetInfo(condDict)
+      entry = DatasetEntryWithID._make(res2["Value"][0])
+    if entry.username != user:
+      return S_ERROR("Dataset %s exists already, it is owned by %s" % (dataset,
+                                                                      entry.username))
+    return self.append_Dataset(entry.id, filelist)
+
+  def append_Dataset(self, dataset_id, filelist):
+    """ add the files in filelist to the dataset.
+        (dataset_id, LFN) is unique, so the LFNs which are already in
+        the dataset, or given twice, are skipped by the DB.
+        return S_OK({"dataset_id": id, "inserted": n, "skipped": n})
+    """
+    # the unique key is on the hash of the LFN, see TransferDB.sql
+    entries = [ FilesInDatasetEntry( dataset_id = dataset_id, LFN = perfile ) +
+                  ( self.helper_LFN_hash(perfile), )
+                  for perfile in filelist ]
+    res = self.helper_begin()
     if not res["OK"]:
       return res
-    filelist = []
-    for entry in map(DatasetEntryWithID._make, res["Value"]):
-      res2 = self.get_FilesInDataset( {"dataset_id": entry.id } )
-      if not res2:
-        return res2
-      filelist . extend ( res2["Value"] )
-    print filelist
-    return S_OK(filelist)
+    connection = res["Value"]
+    res = self.helper_bulk_insert_ignore(self.tables["FilesInDataSet"],
+                                         FilesInDatasetEntry._fields + ("LFN_hash",),
+                                         entries,
+                                         connection)
+    if not res["OK"]:
+      return self.helper_rollback( connection, res )
+    inserted = res["Value"]
+    # the cached number of files gets the inserted ones, in the same transaction
+    res = self._update( "UPDATE %s SET file_count = file_count + %d "
+                        "WHERE id = %d" % ( self.tables["Dataset"],
+                                            inserted, int(dataset_id) ), connection )
+    if not res["OK"]:
+      return self.helper_rollback( connection, res )
+    res = self.helper_commit( connection )
+    if not res["OK"]:
+      gLogger.error(res)
+      return res
+    gLogger.info("dataset %s: %d files inserted, %d skipped" % (dataset_id, inserted,
+                                                              len(entries) - inserted))
+    return S_OK( {"dataset_id": dataset_id,
+                  "inserted": inserted,
+                  "skipped": len(entries) - inserted} )
+
+  def get_Dataset(self, condDict = None, offset = None, limit = None,
+                        lastId = None):
+    """ the files (rows of FilesInDataSet) of the datasets in condDict,
+        with one query, ordered by id.
+        limit gives one page, after the file lastId or after offset files,
+        like get_TransferFileListWithLimit.
+    """
+    try:
+      condition = self.buildCondition( condDict = condDict )
+    except Exception, x:
+      return S_ERROR( x )
+    where = "WHERE dataset_id IN (SELECT id FROM %s %s)" % ( self.tables["Dataset"],
+                                                            condition )
+    if lastId is not None:
+      where += " AND id > %d" % int(lastId)
+    where += " ORDER BY id"
+    if limit:
+      where += " LIMIT %d" % int(limit)
+      if offset:
+        where += " OFFSET %d" % int(offset)
+    return self._query( "SELECT %s FROM %s %s" % ( ", ".join(FilesInDatasetEntryWithID._fields),
+                                                   self.tables["FilesInDataSet"],
+                                                   where ) )
+
+  def get_DatasetFileCount(self, condDict = None):
+    """ the number of files of the datasets in condDict,
+        from the count kept in Dataset when the files are inserted """
+    try:
+      condition = self.buildCondition( condDict = condDict )
+    except Exception, x:
+      return S_ERROR( x )
+    res = self._query( "SELECT SUM(file_count) FROM %s %s" % ( self.tables["Dataset"],
+                                                               condition ) )
+    if not res["OK"]:
+      return res
+    return S_OK( int(res["Value"][0][0] or 0) )
 
   def get_DatasetInfo(self, condDict = None):
     res = self.getFields( self.tables["Dataset"], 
@@ -365,30 +728,190 @@ class TransferDB(DB):
                                   condDict=condDict)
     return res_total
 
+  def show_DatasetSummary(self, condDict=None, orderby=None,
+                                start=None, limit=None):
+    """ one page of the datasets with their number of files,
+        counted with one GROUP BY query.
+        return S_OK([(id, name, username, files), ...])
+    """
+    try:
+      # the page is selected first, so only its files are counted
+      page = self.buildCondition( condDict = condDict, orderAttribute = orderby,
+                                  limit = limit, offset = start )
+      order = self.buildCondition( orderAttribute = orderby )
+    except Exception, x:
+      return S_ERROR( x )
+    return self._query( "SELECT d.id, d.name, d.username, COUNT(f.id) "
+                        "FROM (SELECT %(fields)s FROM %(datasets)s %(page)s) d "
+                        "LEFT JOIN %(files)s f ON f.dataset_id = d.id "
+                        "GROUP BY d.id, d.name, d.username %(order)s" % {
+                          "fields": ", ".join(DatasetEntryWithID._fields),
+                          "datasets": self.tables["Dataset"],
+                          "files": self.tables["FilesInDataSet"],
+                          "page": page,
+                          "order": order } )
+
   def helper_insert_Dataset_table(self, entry):
     if not isinstance(entry, DatasetEntry):
       raise TypeError("entry should be DatasetEntry")
     infoDict = dict(entry._asdict())
-    res = self.insertFields( self.tables["Dataset"],
-                             inDict=infoDict,
-                             )
+    return self.helper_insert_entry(self.tables["Dataset"], infoDict)
+
+  def helper_insert_entry(self, table, infoDict):
+    """ insert one row and return S_OK(its id).
+        the id is the lastrowid of the cursor of the INSERT, a separate
+        "select last_insert_id()" could run on another connection
+        of the pool and get the id of another insert.
+    """
+    res = self.insertFields( table, inDict = infoDict )
+    if not res["OK"]:
+      return res
+    if "lastRowId" not in res:
+      return S_ERROR("Failed to retrieve the new id in %s" % table)
+    return S_OK(int(res["lastRowId"]))
+
+  def helper_transaction(self, cmdList, connection = None):
+    """ run the statements of cmdList in one transaction.
+        _transaction of DIRAC is not one: the connections of the pool
+        are in autocommit mode, each statement is committed on its own.
+        here the transaction is started on one connection, committed
+        at the end, and rolled back if a statement fails.
+        with connection (see helper_begin), the statements run in its
+        transaction, which is not ended here.
+        return S_OK([number of rows of each statement])
+    """
+    if connection is not None:
+      counts = []
+      for cmd in cmdList:
+        res = self._update( cmd, connection )
+        if not res["OK"]:
+          return res
+        counts.append( int(res["Value"]) )
+      return S_OK(counts)
+    res = self.helper_begin()
+    if not res["OK"]:
+      return res
+    connection = res["Value"]
+    res = self.helper_transaction( cmdList, connection )
+    if not res["OK"]:
+      return self.helper_rollback( connection, res )
+    counts = res["Value"]
+    res = self.helper_commit( connection )
+    if not res["OK"]:
+      return res
+    return S_OK(counts)
+
+  def helper_begin(self):
+    """ start a transaction, return S_OK(its connection).
+        the statements of the transaction are run with this connection,
+        it is ended by helper_commit or helper_rollback.
+    """
+    res = self._getConnection()
+    if not res["OK"]:
+      return res
+    connection = res["Value"]
+    res = self._update( "START TRANSACTION", connection )
     if not res["OK"]:
       return res
-    res = self._query("select last_insert_id()")
+    return S_OK(connection)
+
+  def helper_commit(self, connection):
+    res = self._update( "COMMIT", connection )
+    if not res["OK"]:
+      return self.helper_rollback( connection, res )
+    return res
+
+  def helper_rollback(self, connection, error):
+    """ roll back the transaction of connection, return error """
+    res = self._update( "ROLLBACK", connection )
+    if not res["OK"]:
+      # a lost connection is rolled back by the server
+      gLogger.warn("Rollback failed: ", res["Message"])
+    return error
+
+  def helper_bulk_insert(self, table, fields, entries):
+    """ insert entries (tuples in the order of fields) with multi-row
+        INSERT ... VALUES statements of at most BULK_INSERT_CHUNK rows.
+        all the statements run in one transaction (helper_transaction),
+        either all rows are inserted or none.
+
+        return S_OK(the number of inserted rows).
+        the ids are not returned: a multi-row insert does not get
+        consecutive ids with innodb_autoinc_lock_mode = 2.
+    """
+    if not entries:
+      return S_OK(0)
+    res = self.helper_bulk_values(entries)
+    if not res["OK"]:
+      return res
+    quotedFields = _quotedList( list(fields) )
+    cmdList = []
+    for values in res["Value"]:
+      cmdList.append( "INSERT INTO %s (%s) VALUES %s" % ( table,
+                                                          quotedFields,
+                                                          values ) )
+    res = self.helper_transaction( cmdList )
+    if not res["OK"]:
+      gLogger.error(res)
+      return res
+    return S_OK( sum(res["Value"]) )
+
+  def helper_bulk_insert_ignore(self, table, fields, entries, connection = None):
+    """ like helper_bulk_insert, but with INSERT IGNORE, the rows which
+        are duplicated on a unique key are skipped.
+        with connection, the rows are inserted in its transaction,
+        see helper_transaction.
+        return S_OK(the number of inserted rows)
+    """
+    res = self.helper_bulk_values(entries)
     if not res["OK"]:
       return res
-    id = res['Value'][0][0]
-    return S_OK(id)
+    chunks = res["Value"]
+    quotedFields = _quotedList( list(fields) )
+    cmdList = []
+    for values in chunks:
+      cmdList.append( "INSERT IGNORE INTO %s (%s) VALUES %s" % ( table,
+                                                                 quotedFields,
+                                                                 values ) )
+    res = self.helper_transaction( cmdList, connection )
+    if not res["OK"]:
+      gLogger.error(res)
+      return res
+    # the rows of an INSERT IGNORE are the inserted ones, without the skipped
+    return S_OK( sum(res["Value"]) )
+
+  def helper_bulk_values(self, entries):
+    """ the escaped VALUES of entries, one string per BULK_INSERT_CHUNK rows """
+    chunks = []
+    for i in xrange(0, len(entries), self.BULK_INSERT_CHUNK):
+      rows = []
+      for entry in entries[i:i+self.BULK_INSERT_CHUNK]:
+        # None is NULL, _escapeValues does not know it
+        res = self._escapeValues( [value for value in entry if value is not None] )
+        if not res["OK"]:
+          return res
+        escaped = iter(res["Value"])
+        rows.append( "(%s)" % ", ".join("NULL" if value is None else escaped.next()
+                                        for value in entry) )
+      chunks.append( ", ".join(rows) )
+    return S_OK(chunks)
 
   def helper_insert_FilesInDataset_table(self, entry):
     if not isinstance(entry, FilesInDatasetEntry):
       raise TypeError("entry should be FilesInDatasetEntry")
     infoDict = dict(entry._asdict())
+    infoDict["LFN_hash"] = self.helper_LFN_hash(entry.LFN)
     res = self.insertFields( self.tables["FilesInDataSet"],
                              inDict=infoDict,
                              )
     return res
 
+  def helper_LFN_hash(self, lfn):
+    """ the SHA1 of the LFN, like SHA1(LFN) in MySQL """
+    if isinstance(lfn, unicode):
+      lfn = lfn.encode("utf-8")
+    return hashlib.sha1(lfn).hexdigest()
+
 if __name__ == "__main__":
   from DIRAC.Core.Base import Script
   Script.parseCommandLine( ignoreErrors = True )
@@ -401,7 +924,9 @@ if __name__ == "__main__":
                             dstSE = "IHEPD-USER",
                             protocol = "DIRACDMS",
                             status = "new",
-                            submit_time = datetime.datetime.utcnow())
+                            submit_time = datetime.datetime.utcnow(),
+                            priority = 0,
+                            weight = 1)
   res = gDB.insert_TransferRequest(entry)
   trans_id = 1
   if res["OK"]:
@@ -416,6 +941,7 @@ if __name__ == "__main__":
                              finish_time = None,
                              status = "new",
                              error = "",
+                             size = None,
                              )
   gDB.insert_PerTransferFile(entry)
 
@@ -7,6 +7,7 @@
 ALTER DATABASE CHARACTER SET "utf8";
 
 -- for foreign key
+drop table if exists TransferRequestSummary;
 drop table if exists TransferFileList;
 drop table if exists TransferRequest;
 
@@ -20,7 +21,14 @@ create table TransferRequest (
   protocol varchar(255) not null,
   submit_time datetime not null,
   status enum('new', 'transfer', 'finish') not null,
-  index(status)
+  -- the agent serves the higher priority first, then shares
+  -- the workers in proportion to weight
+  priority int not null default 0,
+  weight int not null default 1,
+  -- when the request became *finish*, for the archival of its files
+  finish_time datetime default null,
+  index(status),
+  index(finish_time)
 ) ENGINE=InnoDB;
 
 drop table if exists TransferFileList;
@@ -33,7 +41,49 @@ create table TransferFileList (
   finish_time datetime,
   status enum('new', 'transfer', 'finish', 'kill') not null,
   error mediumtext,
+  -- set by the agent which claimed the file, see claim_TransferFileList
+  claim_token varchar(64) default null,
+  -- from the catalog when the request is loaded, for the accounting
+  size bigint unsigned default null,
   index(status),
+  -- the agent and the handlers select the files of a request by status
+  index TransReqStatus (trans_req_id, status),
+  index(claim_token),
+  foreign key (trans_req_id) references TransferRequest (id)
+) ENGINE=InnoDB;
+
+-- the files of the requests finished for a while are moved here
+-- by the TransferArchiveAgent, see archive_TransferFileList.
+-- the same columns as TransferFileList
+drop table if exists TransferFileListArchive;
+
+create table TransferFileListArchive (
+  id int not null primary key,
+  LFN varchar(255) not null,
+  trans_req_id int not null,
+  start_time datetime,
+  finish_time datetime,
+  status enum('new', 'transfer', 'finish', 'kill') not null,
+  error mediumtext,
+  claim_token varchar(64) default null,
+  size bigint unsigned default null,
+  index(trans_req_id)
+) ENGINE=InnoDB;
+
+-- the counts of the files of an archived request
+create table TransferRequestSummary (
+  trans_req_id int not null primary key,
+  files int not null,
+  -- finish without error
+  ok int not null,
+  -- finish with an error
+  failed int not null,
+  killed int not null,
+  -- of the ok files
+  size bigint unsigned,
+  start_time datetime,
+  finish_time datetime,
+  archive_time datetime not null,
   foreign key (trans_req_id) references TransferRequest (id)
 ) ENGINE=InnoDB;
 
@@ -47,6 +97,8 @@ create table Dataset (
   id int not null auto_increment primary key,
   name varchar(255) not null unique,
   username varchar(255) not null,
+  -- the number of files, kept by insert_Dataset
+  file_count int not null default 0,
   index(username)
 );
 
@@ -54,5 +106,20 @@ create table FilesInDataSet (
   id int not null auto_increment primary key,
   LFN varchar(255) not null,
   dataset_id int not null,
+  -- SHA1(LFN), a key on (dataset_id, LFN) is longer than the
+  -- 767 bytes of an InnoDB key with the COMPACT row format
+  LFN_hash char(40) character set ascii not null,
+  -- a LFN is only once in a dataset. it is also the index for dataset_id
+  unique key DatasetLFN (dataset_id, LFN_hash),
   foreign key (dataset_id) references Dataset (id)
 );
+
+-- 2026.10.19
+-- indexes for the queries of the agent and the handlers.
+-- to upgrade an existing database, use TransferDB-upgrade-indexes.sql
+-- the claim_token and size columns of TransferFileList:
+-- TransferDB-upgrade-claim.sql and TransferDB-upgrade-size.sql
+-- the file_count column of Dataset: TransferDB-upgrade-file-count.sql
+-- the priority and weight columns of TransferRequest:
+-- TransferDB-upgrade-priority.sql
+-- the archive of TransferFileList: TransferDB-upgrade-archive.sql
@@ -7,8 +7,13 @@ import datetime
 from DIRAC import gLogger, gConfig, S_OK, S_ERROR
 from DIRAC.Core.DISET.RequestHandler import RequestHandler
 
+from IHEPDIRAC.TransferSystem.DB.TransferDB import DatasetEntryWithID
+
 global gTransferDB
 
+# max files in one page of listlimit
+MAX_LIST_LIMIT = 10000
+
 def initializeDatasetHandler(serviceInfo):
   """ initialize handler """
   gLogger.info("Initialize Dataset Handler.")
@@ -36,15 +41,33 @@ class DatasetHandler(RequestHandler):
 
   types_create = [str, list]
   def export_create(self, dataset, filelist):
+    """ create the dataset, or append to it if the user has created it.
+        A big list can be sent in chunks, the first with create and
+        the next ones with append.
+        return S_OK({"dataset_id": id, "inserted": n, "skipped": n}),
+        the LFNs already in the dataset are skipped.
+    """
     gLogger.info("Username: ", self.user)
     gLogger.info("Dataset: ", dataset)
-    gLogger.info("Filelist: ", filelist)
+    gLogger.info("Filelist: %d files" % len(filelist))
     res = gTransferDB.insert_Dataset( dataset, self.user, filelist)
+    return res
 
+  types_append = [str, list]
+  def export_append(self, dataset, filelist):
+    """ add the files to an existing dataset of the user, see create """
+    gLogger.info("Dataset: ", dataset)
+    gLogger.info("Filelist: %d files" % len(filelist))
+    res = gTransferDB.get_DatasetInfo( {"name": dataset} )
     if not res["OK"]:
       return res
-
-    return S_OK()
+    if not res["Value"]:
+      return S_ERROR("Dataset %s does not exist" % dataset)
+    entry = DatasetEntryWithID._make(res["Value"][0])
+    if entry.username != self.user:
+      return S_ERROR("Dataset %s is owned by %s" % (dataset, entry.username))
+    res = gTransferDB.append_Dataset( entry.id, filelist )
+    return res
 
   types_list = [ str ]
   def export_list(self, dataset):
@@ -54,6 +77,22 @@ class DatasetHandler(RequestHandler):
     res = gTransferDB.get_Dataset(condDict)
     return res
 
+  types_listlimit = [ str ]
+  def export_listlimit(self, dataset, offset=None, limit=1000, lastId=None):
+    """ one page of the files of the dataset, ordered by id.
+        lastId: the id of the last file of the previous page
+        offset: or the number of the files before the page
+    """
+    limit = min(int(limit), MAX_LIST_LIMIT)
+    res = gTransferDB.get_Dataset({'name': dataset}, offset, limit, lastId)
+    return res
+
+  types_listtotal = [ str ]
+  def export_listtotal(self, dataset):
+    """ the number of the files of the dataset """
+    res = gTransferDB.get_DatasetFileCount({'name': dataset})
+    return res
+
   types_show = [ dict, [list, str], [int, long], [int, long] ]
   def export_show(self, condDict=None, orderby=None,
                         start=None, limit=None):
@@ -65,3 +104,19 @@ class DatasetHandler(RequestHandler):
   def export_showtotal(self, condDict):
     res = gTransferDB.showtotal_Datasets(condDict)
     return res
+
+  types_summary = [ dict, [list, str], [int, long], [int, long] ]
+  def export_summary(self, condDict=None, orderby=None,
+                           start=None, limit=None):
+    """ one page of the datasets with their number of files,
+        and the number of the datasets """
+    res = gTransferDB.showtotal_Datasets(condDict)
+    if not res["OK"]:
+      return res
+    total = res["Value"]
+    res = gTransferDB.show_DatasetSummary(condDict, orderby, start, limit)
+    if not res["OK"]:
+      return res
+    return S_OK({"ParameterNames": ["id", "name", "owner", "files"],
+                 "Records": res["Value"],
+                 "TotalRecords": total})
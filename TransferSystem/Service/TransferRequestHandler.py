@@ -7,9 +7,13 @@ from DIRAC import gLogger, gConfig, S_OK, S_ERROR
 from DIRAC.Core.DISET.RequestHandler import RequestHandler
 
 from IHEPDIRAC.TransferSystem.DB.TransferDB import TransRequestEntry
+from IHEPDIRAC.TransferSystem.DB.TransferDB import TransRequestEntryWithID
 
 tmpGlobalStore = {}
 
+# max files in one page of showlimit
+MAX_SHOW_LIMIT = 10000
+
 global gTransferDB 
 
 def initializeTransferRequestHandler(serviceInfo):
@@ -66,22 +70,53 @@ class TransferRequestHandler(RequestHandler):
     return False
     
   types_create = [ str, str, str, str ]
-  def export_create(self, dataset, ep_from, ep_to, protocol):
+  def export_create(self, dataset, ep_from, ep_to, protocol,
+                          priority=0, weight=1):
+    """ priority: the requests with a higher priority are transferred first
+        weight: the share of the workers among the requests of the user
+                with the same priority, at least 1
+    """
     # check whether the user can create a request
 
     if not self.check_create_permission():
       return S_ERROR("The user can't create transfer request")
+    if not isinstance(priority, (int, long)) or not isinstance(weight, (int, long)):
+      return S_ERROR("priority and weight should be integers")
+    if weight < 1:
+      return S_ERROR("weight should be at least 1")
     entry = TransRequestEntry(username = self.user, 
                               dataset = dataset,
                               srcSE = ep_from,
                               dstSE = ep_to,
                               protocol = protocol,
                               status = "new",
-                              submit_time = datetime.datetime.utcnow())
+                              submit_time = datetime.datetime.utcnow(),
+                              priority = priority,
+                              weight = weight)
     gLogger.info("create an Entry:", entry)
     res = gTransferDB.insert_TransferRequest(entry)
     return res
 
+  types_priority = [ [int, long], [int, long], [int, long] ]
+  def export_priority(self, reqid, priority, weight):
+    """ change the priority and the weight of the request reqid,
+        only the owner of the request can do it
+    """
+    if not self.check_create_permission():
+      return S_ERROR("The user can't change transfer request")
+    if weight < 1:
+      return S_ERROR("weight should be at least 1")
+    res = gTransferDB.get_TransferRequest({"id": reqid})
+    if not res["OK"]:
+      return res
+    if not res["Value"]:
+      return S_ERROR("Request %s does not exist" % reqid)
+    entry = TransRequestEntryWithID._make(res["Value"][0])
+    if entry.username != self.user:
+      return S_ERROR("Request %s is owned by %s" % (reqid, entry.username))
+    res = gTransferDB.update_TransferRequestPriority(reqid, priority, weight)
+    return res
+
   types_status = [ dict ]
   def export_status(self, condDict=None):
     """ This is give the status of the request db
@@ -89,6 +124,14 @@ class TransferRequestHandler(RequestHandler):
     res = gTransferDB.get_TransferRequest(condDict)
     return res
 
+  types_archived = [ dict ]
+  def export_archived(self, condDict=None):
+    """ the summaries of the requests whose files are archived,
+        condDict = {"trans_req_id": 1}
+    """
+    res = gTransferDB.get_TransferRequestSummary(condDict)
+    return res
+
   types_statustotal = [ dict ]
   def export_statustotal(self, condDict=None):
     """ This is give the status of the request db
@@ -111,6 +154,26 @@ class TransferRequestHandler(RequestHandler):
     res = gTransferDB.get_TransferFileList(condDict)
     return res
 
+  types_showtotal = [ dict ]
+  def export_showtotal(self, condDict):
+    """ the number of the files in condDict
+    """
+    res = gTransferDB.get_TransferFileListTotal(condDict)
+    return res
+
+  types_showlimit = [ dict ]
+  def export_showlimit(self, condDict, offset=None, limit=1000,
+                             lastId=None, withError=False):
+    """ one page of the file list, ordered by id.
+        lastId: the id of the last file of the previous page
+        offset: or the number of the files before the page
+        withError: include the error text
+    """
+    limit = min(int(limit), MAX_SHOW_LIMIT)
+    res = gTransferDB.get_TransferFileListWithLimit(condDict, offset, limit,
+                                                   lastId, withError)
+    return res
+
   types_delete = [ dict ]
   def export_delete(self, condDict):
     """ This will make the status to kill
@@ -124,6 +187,27 @@ class TransferRequestHandler(RequestHandler):
     res = gTransferDB.delete_TransferFileListByReq(condDict)
     return res
 
+  types_kill = [ dict ]
+  def export_kill(self, condDict):
+    """ This will make the status of all the files in condDict to kill
+         (new, transfer) --> kill
+        condDict = {"trans_req_id": 1} or {"id": [154, 155]}
+        return the number of killed files
+    """
+    res = gTransferDB.kill_TransferFileList(condDict)
+    return res
+
+  types_requeue = [ dict, bool ]
+  def export_requeue(self, condDict, failedOnly):
+    """ This will make the status of all the files in condDict to new
+         (kill, finish) --> new
+        condDict = {"trans_req_id": 1} or {"id": [154, 155]}
+        failedOnly: only the killed files and the files with an error
+        return the number of requeued files
+    """
+    res = gTransferDB.requeue_TransferFileList(condDict, failedOnly)
+    return res
+
   types_retransfer = [ dict ]
   def export_retransfer(self, condDict):
     """ This will make the status to new
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Benchmark the scheduling of the TransferAgent without SEs and MySQL.
+
+   The agent runs on a TransferDB stored in memory with sqlite, and its
+   requests use the SIMULATE protocol: a worker which "copies" its files
+   in a thread, each file taking latency seconds, and fails a file with
+   the given rate. nRequests requests of nFiles files each are loaded,
+   then the agent runs until all the files are finished.
+   It reports the files scheduled per second, the DB queries per file and
+   how long the worker slots stay idle.
+   It needs the DIRAC python environment, but no DIRAC service.
+   Usage :
+    python benchmarkTransferAgent.py [nRequests] [nFiles] [maxTransfer] [batchSize] [latency] [failureRate] [size]
+    Example: python benchmarkTransferAgent.py 10 200 10 20 0.01 0.05 100000000
+"""
+import os
+import re
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import threading
+
+from DIRAC import gLogger, S_OK, S_ERROR
+
+import IHEPDIRAC.TransferSystem.DB.TransferDB as TransferDBModule
+from IHEPDIRAC.TransferSystem.DB.TransferDB import TransferDB, TransRequestEntry
+from IHEPDIRAC.TransferSystem.Agent.TransferAgent import TransferAgent
+import IHEPDIRAC.TransferSystem.Agent.helper
+# the package binds the name helper_TransferAgent to the class,
+# the module is only in sys.modules
+helperModule = sys.modules["IHEPDIRAC.TransferSystem.Agent.helper.helper_TransferAgent"]
+from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory import gTransferFactory
+from IHEPDIRAC.TransferSystem.Agent.helper.TransferFactory.ITransferWorker import BatchTransferWorker
+
+nRequests = 10
+nFiles = 200
+maxTransfer = 10
+batchSize = 20
+latency = 0.01
+failureRate = 0.0
+size = 100000000
+args = sys.argv[1:]
+if args and args[0] in ("-h", "--help"):
+  print __doc__
+  sys.exit(0)
+if len(args) > 0:
+  nRequests = int(args[0])
+if len(args) > 1:
+  nFiles = int(args[1])
+if len(args) > 2:
+  maxTransfer = int(args[2])
+if len(args) > 3:
+  batchSize = int(args[3])
+if len(args) > 4:
+  latency = float(args[4])
+if len(args) > 5:
+  failureRate = float(args[5])
+if len(args) > 6:
+  size = int(args[6])
+# stop if the files are not finished after this many seconds
+maxTime = 600
+
+# the tables of TransferDB.sql for sqlite
+schema = """
+create table TransferRequest (
+  id integer primary key autoincrement,
+  username varchar(255) not null,
+  dataset varchar(255) not null,
+  srcSE varchar(255) not null,
+  dstSE varchar(255) not null,
+  protocol varchar(255) not null,
+  submit_time datetime not null,
+  status varchar(16) not null,
+  priority int not null default 0,
+  weight int not null default 1,
+  finish_time datetime default null
+);
+create index TransferRequestStatus on TransferRequest (status);
+create table TransferFileList (
+  id integer primary key autoincrement,
+  LFN varchar(255) not null,
+  trans_req_id int not null,
+  start_time datetime,
+  finish_time datetime,
+  status varchar(16) not null,
+  error mediumtext,
+  claim_token varchar(64) default null,
+  size bigint default null
+);
+create index TransReqStatus on TransferFileList (trans_req_id, status);
+create index TransferFileListStatus on TransferFileList (status);
+create index TransferFileListClaim on TransferFileList (claim_token);
+create table Dataset (
+  id integer primary key autoincrement,
+  name varchar(255) not null unique,
+  username varchar(255) not null,
+  file_count int not null default 0
+);
+create table FilesInDataSet (
+  id integer primary key autoincrement,
+  LFN varchar(255) not null,
+  dataset_id int not null,
+  LFN_hash char(40) not null,
+  unique (dataset_id, LFN_hash)
+);
+"""
+
+class SQLiteTransferDB(TransferDB):
+  """
+  TransferDB in a sqlite memory database.
+  The MySQL statements of TransferDB are translated, and counted.
+  """
+
+  def __init__(self, *args):
+    # no DB.__init__, there is no MySQL
+    self.log = gLogger.getSubLogger("SQLiteTransferDB")
+    self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+    self.conn.isolation_level = None
+    self.conn.executescript(schema)
+    self.queries = 0
+
+  def translate(self, cmd):
+    if cmd == "START TRANSACTION":
+      return "BEGIN"
+    # UPDATE ... ORDER BY ... LIMIT n is not in the default sqlite
+    m = re.match(r"(?is)UPDATE (\w+) SET (.*?) (WHERE .*?) ORDER BY (.*?) LIMIT (\d+)\s*$", cmd)
+    if m:
+      table, sets, where, order, limit = m.groups()
+      cmd = "UPDATE %s SET %s WHERE id IN (SELECT id FROM %s %s ORDER BY %s LIMIT %s)" % (
+              table, sets, table, where, order, limit)
+    cmd = re.sub(r"(?i)UTC_TIMESTAMP\(\)", "datetime('now')", cmd)
+    # the first id of a multi-row INSERT, like MySQL
+    cmd = re.sub(r"(?i)LAST_INSERT_ID\(\)", "(last_insert_rowid() - changes() + 1)", cmd)
+    cmd = re.sub(r"(?i)ROW_COUNT\(\)", "changes()", cmd)
+    cmd = re.sub(r"(?i)^INSERT IGNORE", "INSERT OR IGNORE", cmd)
+    return cmd
+
+  def execute(self, cmd):
+    self.queries += 1
+    cursor = self.conn.execute(self.translate(cmd))
+    return cursor
+
+  def _getConnection(self):
+    # one connection, the statements of helper_transaction run on it
+    return S_OK(self.conn)
+
+  def _query(self, cmd, conn=None, debug=False):
+    try:
+      return S_OK(tuple(tuple(row) for row in self.execute(cmd).fetchall()))
+    except sqlite3.Error, x:
+      return S_ERROR("%s: %s" % (x, cmd))
+
+  def _update(self, cmd, conn=None, debug=False):
+    try:
+      cursor = self.execute(cmd)
+    except sqlite3.Error, x:
+      return S_ERROR("%s: %s" % (x, cmd))
+    res = S_OK(cursor.rowcount)
+    res["lastRowId"] = cursor.lastrowid
+    return res
+
+  def _transaction(self, cmdList, conn=None):
+    # like DIRAC, (cmd, number of rows) for each statement.
+    # it is not a transaction: each statement is committed on its own,
+    # the ones before a failure are kept
+    results = []
+    try:
+      for cmd in cmdList:
+        results.append((cmd, self.execute(cmd).rowcount))
+    except sqlite3.Error, x:
+      return S_ERROR(str(x))
+    return S_OK(results)
+
+  def _MySQL__escapeString(self, value):
+    # the escaping of MySQL uses its connection
+    value = str(value)
+    if value.startswith("UTC_TIMESTAMP"):
+      return S_OK(value)
+    return S_OK("'%s'" % value.replace("'", "''"))
+
+  def _escapeString(self, value, conn=None):
+    return self._MySQL__escapeString(value)
+
+  def _escapeValues(self, inValues=None):
+    values = []
+    for value in inValues or []:
+      if isinstance(value, (list, tuple)):
+        values.append("(%s)" % ", ".join(self._MySQL__escapeString(v)["Value"] for v in value))
+      else:
+        values.append(self._MySQL__escapeString(value)["Value"])
+    return S_OK(values)
+
+class SimulatedCatalog(object):
+  """ every file has the same size """
+
+  def getFileSize(self, lfns):
+    return S_OK({"Successful": dict((lfn, size) for lfn in lfns), "Failed": {}})
+
+class SimulatedCopy(threading.Thread):
+  """ "copy" the files of a worker, like GFAL2Copy """
+
+  def __init__(self, info, fd):
+    super(SimulatedCopy, self).__init__()
+    self.daemon = True
+    self.info = info
+    self.fd = fd
+    self.returncode = None
+    self.killed = False
+
+  def poll(self):
+    return self.returncode
+
+  def kill(self):
+    self.killed = True
+
+  def run(self):
+    try:
+      for f in self.info["files"]:
+        start = time.time()
+        time.sleep(latency)
+        if self.killed or random.random() < failureRate:
+          line = "TRANSFER_FAILED %s simulated failure\n" % f["LFN"]
+        else:
+          line = "TRANSFER_OK %s %d %.3f %.3f\n" % (f["LFN"], size, start, time.time())
+        os.write(self.fd, line)
+      self.returncode = 0
+    finally:
+      os.close(self.fd)
+
+class SIMULATETransferWorker(BatchTransferWorker):
+
+  def create_popen(self, info):
+    self._info = info
+    self._results = {}
+    self._partial = {}
+    r, w = os.pipe()
+    self._streams = [os.fdopen(r)]
+    self._proc = SimulatedCopy(info, w)
+    self._proc.start()
+
+class BenchmarkAgent(TransferAgent):
+  """ the TransferAgent without the AgentModule configuration """
+
+  def __init__(self, options, workDir):
+    self.options = options
+    self.workDir = workDir
+    # (start, end) of each removed worker
+    self.lifetimes = []
+
+  def am_getOption(self, name, default=None):
+    return self.options.get(name, default)
+
+  def am_getPollingTime(self):
+    return 120
+
+  def am_getControlDirectory(self):
+    return self.workDir
+
+  def am_getWorkDirectory(self):
+    return self.workDir
+
+  def handle_exited_worker(self, worker):
+    removed = TransferAgent.handle_exited_worker(self, worker)
+    if removed:
+      self.lifetimes.append((worker.start_time, time.time()))
+    return removed
+
+def load(db):
+  for req in xrange(nRequests):
+    name = "dataset%d" % req
+    db.insert_Dataset(name, "user%d" % (req % 3),
+                      ["/bes/File/%s/file%06d.dst" % (name, i) for i in xrange(nFiles)])
+    db.insert_TransferRequest(TransRequestEntry(username = "user%d" % (req % 3),
+                                                dataset = name,
+                                                srcSE = "IHEP-USER",
+                                                dstSE = "JINR-USER",
+                                                protocol = "SIMULATE",
+                                                submit_time = "2026-10-19 00:00:00",
+                                                status = "new",
+                                                priority = 0,
+                                                weight = 1))
+
+def unfinished(db):
+  res = db._query("select count(*) from TransferFileList where status in ('new', 'transfer')")
+  return res["Value"][0][0]
+
+gLogger.setLevel("ERROR")
+gTransferFactory.register("SIMULATE", SIMULATETransferWorker)
+TransferDBModule.TransferDB = SQLiteTransferDB
+helperModule.FileCatalog = SimulatedCatalog
+
+workDir = tempfile.mkdtemp()
+agent = BenchmarkAgent({"MAX_TRANSFER": maxTransfer,
+                        "BATCH_SIZE": batchSize,
+                        # the benchmark does not send accounting
+                        "ACCOUNTING_MAX_RECORDS": 10**9,
+                        "ACCOUNTING_INTERVAL": 10**9},
+                       workDir)
+agent.initialize()
+db = agent.helper.transferDB
+
+start = time.time()
+load(db)
+loadTime = time.time() - start
+loadQueries = db.queries
+print "loaded %d requests of %d files: %.2f s, %d queries" % (nRequests, nFiles, loadTime, loadQueries)
+
+start = time.time()
+cycles = 0
+while time.time() - start < maxTime:
+  agent.execute()
+  cycles += 1
+  if not agent.transfer_worker and not unfinished(db):
+    # the last check of the requests
+    agent.helper.helper_check_request()
+    break
+elapsed = time.time() - start
+queries = db.queries - loadQueries
+
+total = nRequests * nFiles
+res = db._query("select status, count(*) from TransferFileList group by status")
+statuses = dict(res["Value"])
+busy = sum(end - begin for begin, end in agent.lifetimes)
+idle = maxTransfer * elapsed - busy
+# the time the files need with all the slots always busy
+ideal = total * latency / maxTransfer
+print "files: %d, %s, in %.2f s, %d cycles" % (total, statuses, elapsed, cycles)
+print "workers: %d" % len(agent.lifetimes)
+print "files scheduled per second: %.1f" % (total / elapsed)
+print "DB queries per file: %.3f" % (float(queries) / total)
+print "idle slot time: %.2f s of %.2f s (%.1f%%)" % (idle, maxTransfer * elapsed,
+                                                      100.0 * idle / (maxTransfer * elapsed))
+print "overhead over the ideal %.2f s: %.2f s" % (ideal, elapsed - ideal)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Benchmark the queries of the TransferAgent and the handlers on a synthetic
+   TransferDB, before and after TransferDB-upgrade-indexes.sql.
+
+   It creates a scratch database (dropped at the end), fills it with
+   nRequests requests of nFiles/nRequests files each and one dataset per
+   request, then times the queries with the old schema and again after the
+   upgrade.
+   Usage :
+    python benchmarkTransferDBIndexes.py <host> <user> <password> [nFiles] [nRequests]
+    Example: python benchmarkTransferDBIndexes.py localhost root xxx 5000000 500
+"""
+import os
+import sys
+import time
+import random
+import MySQLdb
+
+if len(sys.argv) < 4:
+  print __doc__
+  sys.exit(1)
+host, user, passwd = sys.argv[1:4]
+nFiles = 5000000
+nRequests = 500
+if len(sys.argv) > 4:
+  nFiles = int(sys.argv[4])
+if len(sys.argv) > 5:
+  nRequests = int(sys.argv[5])
+dbName = "TransferDBBenchmark"
+chunk = 10000
+repeat = 20
+
+# the schema before the upgrade, with the claim_token of
+# TransferDB-upgrade-claim.sql
+oldSchema = [
+"""create table TransferRequest (
+  id int not null auto_increment primary key,
+  username varchar(255) not null,
+  index(username),
+  dataset varchar(255) not null,
+  srcSE varchar(255) not null,
+  dstSE varchar(255) not null,
+  protocol varchar(255) not null,
+  submit_time datetime not null,
+  status enum('new', 'transfer', 'finish') not null,
+  index(status)
+) ENGINE=InnoDB""",
+"""create table TransferFileList (
+  id int not null auto_increment primary key,
+  LFN varchar(255) not null,
+  trans_req_id int not null,
+  start_time datetime,
+  finish_time datetime,
+  status enum('new', 'transfer', 'finish', 'kill') not null,
+  error mediumtext,
+  claim_token varchar(64) default null,
+  index(status),
+  index(claim_token),
+  foreign key (trans_req_id) references TransferRequest (id)
+) ENGINE=InnoDB""",
+"""create table Dataset (
+  id int not null auto_increment primary key,
+  name varchar(255) not null unique,
+  username varchar(255) not null,
+  index(username)
+)""",
+"""create table FilesInDataSet (
+  id int not null auto_increment primary key,
+  LFN varchar(255) not null,
+  dataset_id int not null,
+  foreign key (dataset_id) references Dataset (id)
+)""",
+]
+
+def upgradeStatements():
+  """statements of TransferDB-upgrade-indexes.sql"""
+  sqlFile = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "..", "DB", "TransferDB-upgrade-indexes.sql")
+  lines = [l for l in open(sqlFile) if not l.strip().startswith("--")]
+  return [s.strip() for s in "".join(lines).split(";") if s.strip()]
+
+def fill(cursor):
+  filesPerReq = nFiles / nRequests
+  for req in xrange(1, nRequests+1):
+    # most requests are finished, a few are still running
+    if req % 10 == 0:
+      status = "transfer"
+    else:
+      status = "finish"
+    cursor.execute("insert into TransferRequest (username, dataset, srcSE, dstSE, protocol, submit_time, status) "
+                   "values ('user%d', 'dataset%d', 'IHEP-USER', 'JINR-USER', 'DIRACFTS', now(), '%s')"
+                   % (req % 7, req, status))
+    cursor.execute("insert into Dataset (name, username) values ('dataset%d', 'user%d')" % (req, req % 7))
+    for first in xrange(0, filesPerReq, chunk):
+      files = []
+      dsfiles = []
+      for i in xrange(first, min(first+chunk, filesPerReq)):
+        lfn = "/bes/File/dataset%d/file%08d.dst" % (req, i)
+        if status == "finish":
+          fileStatus = "finish"
+        else:
+          fileStatus = random.choice(["new", "new", "transfer", "finish"])
+        files.append("('%s', %d, now(), now(), '%s', '')" % (lfn, req, fileStatus))
+        dsfiles.append("('%s', %d)" % (lfn, req))
+      cursor.execute("insert into TransferFileList (LFN, trans_req_id, start_time, finish_time, status, error) values %s"
+                     % ", ".join(files))
+      cursor.execute("insert into FilesInDataSet (LFN, dataset_id) values %s" % ", ".join(dsfiles))
+
+def queries():
+  """the queries of TransferDB used by the agent and the handlers,
+     on a running request, with the statement which undoes it, if any"""
+  req = random.randint(1, nRequests/10) * 10
+  return [
+    ("claim_TransferFileList: claim 10 new files",
+     "update TransferFileList set status = 'transfer', claim_token = 'benchmark', "
+     "start_time = utc_timestamp() where trans_req_id = %d and status = 'new' "
+     "order by id limit 10" % req,
+     "update TransferFileList set status = 'new', claim_token = null "
+     "where claim_token = 'benchmark'"),
+    ("get_TransferFileListStatusCount: files by status",
+     "select f.trans_req_id, f.status, count(*) from TransferFileList f "
+     "join TransferRequest r on f.trans_req_id = r.id where r.status = 'transfer' "
+     "group by f.trans_req_id, f.status",
+     None),
+    ("get_TransferFileListWithLimit: a page of a request",
+     "select id, LFN, status from TransferFileList where trans_req_id = %d "
+     "order by id limit 1000" % req,
+     None),
+    ("get_Dataset: files of a dataset",
+     "select id, LFN, dataset_id from FilesInDataSet where dataset_id in "
+     "(select id from Dataset where name = 'dataset%d') order by id" % req,
+     None),
+  ]
+
+def measure(cursor):
+  times = {}
+  for i in xrange(repeat):
+    for name, sql, undo in queries():
+      start = time.time()
+      cursor.execute(sql)
+      cursor.fetchall()
+      times.setdefault(name, []).append(time.time() - start)
+      if undo:
+        cursor.execute(undo)
+  result = {}
+  for name, values in times.items():
+    values.sort()
+    result[name] = values[len(values)/2]
+  return result
+
+conn = MySQLdb.connect(host=host, user=user, passwd=passwd)
+conn.autocommit(True)
+cursor = conn.cursor()
+cursor.execute("drop database if exists %s" % dbName)
+cursor.execute("create database %s" % dbName)
+cursor.execute("use %s" % dbName)
+try:
+  for sql in oldSchema:
+    cursor.execute(sql)
+  start = time.time()
+  fill(cursor)
+  print "filled %d files in %d requests: %.1f s" % (nFiles, nRequests, time.time()-start)
+
+  before = measure(cursor)
+  start = time.time()
+  for sql in upgradeStatements():
+    cursor.execute(sql)
+  print "upgrade: %.1f s" % (time.time()-start)
+  after = measure(cursor)
+
+  print "%-55s %12s %12s" % ("median query time", "before (ms)", "after (ms)")
+  for name, sql, undo in queries():
+    print "%-55s %12.2f %12.2f" % (name, before[name]*1000, after[name]*1000)
+finally:
+  cursor.execute("drop database if exists %s" % dbName)
+  conn.close()
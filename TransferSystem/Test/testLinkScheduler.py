@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+Check how LinkScheduler shares the new workers between the links and
+the requests, with a fake WorkerManager.
+Usage:
+  python testLinkScheduler.py
+"""
+
+from IHEPDIRAC.TransferSystem.Agent.helper.LinkScheduler import LinkScheduler
+from IHEPDIRAC.TransferSystem.DB.TransferDB import TransRequestEntryWithID
+
+class FakeManager(object):
+  """ free slots and running workers per link """
+
+  def __init__(self, free=100, running=0):
+    self.free = free
+    self.running_workers = running
+
+  def link_free_slots(self, link):
+    if isinstance(self.free, dict):
+      return self.free.get(link, 0)
+    return self.free
+
+  def running(self, link):
+    return self.running_workers
+
+  def link_of(self, worker):
+    return ("S", "D")
+
+class FakeWorker(object):
+
+  def __init__(self, stats):
+    self.stats = stats
+    self.info = {"done": []}
+    self.files = []
+    self.file_sizes = {}
+    self.start_time = 0
+
+  def file_stats(self):
+    return self.stats
+
+def request(id, user, priority=0, weight=1, link=("S", "D")):
+  return TransRequestEntryWithID(id, user, "dataset", link[0], link[1], "DIRACFTS",
+                                 "2026-10-19", "transfer", priority, weight)
+
+def test_no_request():
+  scheduler = LinkScheduler(FakeManager())
+  assert scheduler.allocate(10, []) == {}
+  assert scheduler.allocate(0, [request(1, "a")]) == {}
+
+def test_no_rate_yet():
+  # without a measure the target is not used, only the free slots
+  scheduler = LinkScheduler(FakeManager(free=3), target_rate=10)
+  assert scheduler.wanted_workers(("S", "D")) is None
+  assert scheduler.allocate(10, [request(1, "a")]) == {1: 3}
+
+def test_target_rate():
+  scheduler = LinkScheduler(FakeManager(free=100, running=1), target_rate=10)
+  # 4 MB in 2 s, the files are copied in parallel
+  scheduler.record(FakeWorker({1: (2000000, 10.0, 12.0), 2: (2000000, 10.0, 12.0)}))
+  assert scheduler.rates[("S", "D")] == 2e6
+  assert scheduler.wanted_workers(("S", "D")) == 5
+  # one is running already
+  assert scheduler.allocate(10, [request(1, "a")]) == {1: 4}
+
+def test_empty_stats():
+  # no size, no rate
+  scheduler = LinkScheduler(FakeManager())
+  scheduler.record(FakeWorker({}))
+  assert scheduler.rates == {}
+
+def test_priority():
+  scheduler = LinkScheduler(FakeManager())
+  assert scheduler.allocate(5, [request(1, "a"), request(2, "b", priority=5)]) == {2: 5}
+
+def test_full_link():
+  # the higher priority request has only 2 slots on its link
+  manager = FakeManager(free={("S", "D"): 100, ("S", "X"): 2})
+  scheduler = LinkScheduler(manager)
+  requests = [request(1, "a"), request(2, "b", priority=5, link=("S", "X"))]
+  assert scheduler.allocate(10, requests) == {1: 8, 2: 2}
+  # the 2 slots are taken by workers not started yet
+  assert scheduler.allocate(10, requests, {2: 2}) == {1: 10}
+
+def test_fair_share():
+  # one slot per user and round, split by weight between its requests
+  scheduler = LinkScheduler(FakeManager())
+  requests = [request(1, "a", weight=1), request(2, "a", weight=3), request(3, "b")]
+  total = {}
+  for i in range(10):
+    for id, n in scheduler.allocate(8, requests).items():
+      total[id] = total.get(id, 0) + n
+  assert total == {1: 10, 2: 30, 3: 40}, total
+
+if __name__ == "__main__":
+  for name, test in sorted(globals().items()):
+    if name.startswith("test_"):
+      test()
+      print "%s: OK" % name
@@ -8,10 +8,12 @@ Script.setUsageMessage("""
 Create a data transfer request.
 
 Usage:
-  %s <dataset name> <src SE> <dst SE> -p <Protocol>
+  %s <dataset name> <src SE> <dst SE> -p <Protocol> [-P <Priority>] [-w <Weight>]
 """ % Script.scriptName)
 
 Script.registerSwitch("p:", "protocol=", "Transfer Protocol")
+Script.registerSwitch("P:", "priority=", "Priority, the higher is transferred first (default 0)")
+Script.registerSwitch("w:", "weight=", "Share of the workers among the requests of the same priority (default 1)")
 Script.parseCommandLine( ignoreErrors = True )
 
 args = Script.getPositionalArgs()
@@ -19,9 +21,15 @@ if (len(args) != 3):
   gLogger.error("Please support dataset name, src SE, dst SE.")
   DIRAC.exit(-1)
 protocol = "DIRACDMS" # default
+priority = 0
+weight = 1
 for k, v in Script.getUnprocessedSwitches():
   if k in ('p', 'protocol'):
     protocol = v
+  elif k in ('P', 'priority'):
+    priority = int(v)
+  elif k in ('w', 'weight'):
+    weight = int(v)
 
 from DIRAC.Core.DISET.RPCClient import RPCClient
 
@@ -31,5 +39,5 @@ dataset = args[0]
 ep_from = args[1]
 ep_to = args[2]
 
-print transferRequest.create(dataset, ep_from, ep_to, protocol)
+print transferRequest.create(dataset, ep_from, ep_to, protocol, priority, weight)
 
@@ -5,37 +5,62 @@ from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
 Script.setUsageMessage("""
-Create a dataset with a list of LFNs
+Create a dataset with a list of LFNs.
+The LFNs are sent in chunks, and the LFNs already in the dataset are
+skipped, so the same command can be run again after a failure.
 
 Usage:
   %s <new dataset name> <filelist>
 """ % Script.scriptName)
 
 Script.registerSwitch("f:", "file=", "file contains LFN")
+Script.registerSwitch("n:", "chunk=", "LFNs sent in one call, default 10000")
 
 Script.parseCommandLine( ignoreErrors = True )
 
 filelist = []
+chunkSize = 10000
+# the lines of the files, with the empty ones
+lines = 0
 
 for k,v in Script.getUnprocessedSwitches():
   if k.lower() in ["f", "file"]:
     with open(v) as f:
       for line in f:
-        filelist.append(line.strip())
+        lines += 1
+        if line.strip():
+          filelist.append(line.strip())
+  if k.lower() in ["n", "chunk"]:
+    chunkSize = int(v)
 
 args = Script.getPositionalArgs()
-if ( len(args) == 0 or (len(filelist)+len(args) < 2) ):
+if ( len(args) == 0 or (lines+len(args) < 2) ):
   gLogger.error("Please support dataset name and LFNs")
   DIRAC.exit(-1)
 dataset = args[0]
 filelist.extend(args[1:])
 
 gLogger.info("Dataset is ", dataset)
-gLogger.info("FileList is ", filelist)
+gLogger.info("FileList is %d files" % len(filelist))
 
 from DIRAC.Core.DISET.RPCClient import RPCClient
 
 transferRequest = RPCClient("Transfer/Dataset")
 
-print transferRequest.create(dataset, filelist)
+inserted = 0
+skipped = 0
+# create is called even without files, the dataset is created empty
+for i in range(0, max(len(filelist), 1), chunkSize):
+  if i == 0:
+    res = transferRequest.create(dataset, filelist[i:i+chunkSize])
+  else:
+    res = transferRequest.append(dataset, filelist[i:i+chunkSize])
+  if not res["OK"]:
+    gLogger.error(res["Message"])
+    print "inserted: %d, skipped: %d, not sent: %d" % (inserted, skipped, len(filelist)-i)
+    DIRAC.exit(-1)
+  inserted += res["Value"]["inserted"]
+  skipped += res["Value"]["skipped"]
+
+print "inserted: %d, skipped: %d" % (inserted, skipped)
 
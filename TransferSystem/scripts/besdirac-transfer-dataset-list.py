@@ -5,14 +5,20 @@ from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
 Script.setUsageMessage("""
-Show a list of LFNs in a dataset 
+Show a list of LFNs in a dataset, page by page.
 
 Usage:
   %s <dataset name> 
 """ % Script.scriptName)
 
+Script.registerSwitch("n:", "page=", "files in one page, default 1000")
 Script.parseCommandLine( ignoreErrors = True )
 
+pageSize = 1000
+for k, v in Script.getUnprocessedSwitches():
+  if k in ('n', 'page'):
+    pageSize = int(v)
+
 args = Script.getPositionalArgs()
 if ( len(args) == 0 ):
   gLogger.error("Please give the dataset name")
@@ -26,10 +32,16 @@ from DIRAC.Core.DISET.RPCClient import RPCClient
 
 transferRequest = RPCClient("Transfer/Dataset")
 
-res = transferRequest.list(dataset)
-
-if not res["OK"]:
-  gLogger.error(res)
-
-for entry in res["Value"]:
-  print entry
+lastId = 0
+while True:
+  res = transferRequest.listlimit(dataset, None, pageSize, lastId)
+  if not res["OK"]:
+    gLogger.error(res)
+    DIRAC.exit(-1)
+  # the service may send less than pageSize files (MAX_LIST_LIMIT),
+  # so only an empty page is the end
+  if not res["Value"]:
+    break
+  for entry in res["Value"]:
+    print entry
+  lastId = res["Value"][-1][0]
@@ -5,7 +5,7 @@ from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
 Script.setUsageMessage("""
-Show a list of datasets
+Show a list of datasets, with their number of files
 
 """)
 
@@ -20,19 +20,14 @@ orderby = []
 start = 0
 limit = 50
 
-res = transferRequest.showtotal(condDict)
+res = transferRequest.summary(condDict, orderby, start, limit)
 
 if not res["OK"]:
   gLogger.error(res)
   DIRAC.exit(-1)
 
-print "Total:", res["Value"]
+print "Total:", res["Value"]["TotalRecords"]
+print res["Value"]["ParameterNames"]
 
-res = transferRequest.show(condDict, orderby, start, limit)
-
-if not res["OK"]:
-  gLogger.error(res)
-  DIRAC.exit(-1)
-
-for entry in res["Value"]:
+for entry in res["Value"]["Records"]:
   print entry
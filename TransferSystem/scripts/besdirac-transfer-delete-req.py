@@ -5,10 +5,10 @@ from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
 Script.setUsageMessage("""
-delete a file transfer.
+delete the file transfers of a request.
 NOTE: This will only kill transfer which does not finish.
 Usage:
-  %s <fileid>
+  %s <ReqID>
 """ % Script.scriptName)
 
 Script.parseCommandLine( ignoreErrors = True )
@@ -22,6 +22,10 @@ from DIRAC.Core.DISET.RPCClient import RPCClient
 
 transferRequest = RPCClient("Transfer/TransferRequest")
 
-fileid = int(args[0])
+reqid = int(args[0])
 
-print transferRequest.delete_files_in_req({"trans_req_id":fileid})
+res = transferRequest.kill({"trans_req_id":reqid})
+if not res["OK"]:
+  gLogger.error(res["Message"])
+  DIRAC.exit(-1)
+print "%d files are killed." % res["Value"]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+import DIRAC
+from DIRAC import gLogger
+from DIRAC.Core.Base import Script
+
+Script.setUsageMessage("""
+change the priority and the weight of a request.
+The requests with a higher priority are transferred first, the requests
+of the same priority share the workers in proportion to their weights.
+Usage:
+  %s <ReqID> <Priority> [Weight]
+""" % Script.scriptName)
+
+Script.parseCommandLine( ignoreErrors = True )
+
+args = Script.getPositionalArgs()
+if (len(args) not in (2, 3)):
+  gLogger.error("Please support ReqID and Priority.")
+  DIRAC.exit(-1)
+
+from DIRAC.Core.DISET.RPCClient import RPCClient
+
+transferRequest = RPCClient("Transfer/TransferRequest")
+
+reqid = int(args[0])
+priority = int(args[1])
+weight = 1
+if len(args) == 3:
+  weight = int(args[2])
+
+res = transferRequest.priority(reqid, priority, weight)
+if not res["OK"]:
+  gLogger.error(res["Message"])
+  DIRAC.exit(-1)
+print "request %d: priority %d, weight %d" % (reqid, priority, weight)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import DIRAC
+from DIRAC import gLogger
+from DIRAC.Core.Base import Script
+
+Script.setUsageMessage("""
+Replicate a list of LFNs in one process, used by the TransferAgent workers.
+The result of each file is printed in one line:
+  TRANSFER_OK <LFN> <bytes> <start> <end>
+  TRANSFER_FAILED <LFN> <reason>
+start and end are the seconds since epoch.
+
+Usage:
+  %s <src SE> <dst SE> <LFN> [<LFN> ...] [--fts]
+""" % Script.scriptName)
+
+Script.registerSwitch("", "fts", "Submit all the files in one FTS job")
+Script.parseCommandLine( ignoreErrors = True )
+
+args = Script.getPositionalArgs()
+if (len(args) < 3):
+  gLogger.error("Please support src SE, dst SE and LFNs.")
+  DIRAC.exit(-1)
+useFTS = False
+for k, v in Script.getUnprocessedSwitches():
+  if k.lower() == "fts":
+    useFTS = True
+
+srcSE = args[0]
+dstSE = args[1]
+lfns = args[2:]
+
+def report(lfn, error, start=0, end=0, size=None):
+  if error:
+    print "TRANSFER_FAILED %s %s" % (lfn, str(error).replace("\n", " "))
+  else:
+    if size is None:
+      size = sizes.get(lfn, 0)
+    print "TRANSFER_OK %s %d %.3f %.3f" % (lfn, size, start, end)
+
+# the sizes of the files for the accounting
+from DIRAC.Resources.Catalog.FileCatalog import FileCatalog
+sizes = {}
+res = FileCatalog().getFileSize(lfns)
+if res["OK"]:
+  sizes = res["Value"]["Successful"]
+else:
+  gLogger.warn("get file size error: ", res["Message"])
+
+if useFTS:
+  from DIRAC.DataManagementSystem.Client.FTSRequest import FTSRequest
+  ftsRequest = FTSRequest()
+  ftsRequest.setSourceSE(srcSE)
+  ftsRequest.setTargetSE(dstSE)
+  for lfn in lfns:
+    ftsRequest.setLFN(lfn)
+  start = time.time()
+  res = ftsRequest.submit(monitor = True, printOutput = False)
+  end = time.time()
+  for lfn in lfns:
+    if not res["OK"]:
+      report(lfn, res["Message"])
+      continue
+    fileInfo = ftsRequest.fileDict.get(lfn, {})
+    status = fileInfo.get("Status", "Unknown")
+    if status in ("Finished", "Done"):
+      # the files of one job are copied in parallel,
+      # FTS gives the duration of each file
+      try:
+        fileStart = end - float(fileInfo["Duration"])
+      except (KeyError, TypeError, ValueError):
+        fileStart = start
+      report(lfn, "", max(start, fileStart), end, fileInfo.get("Size"))
+    else:
+      report(lfn, "%s: %s" % (status, fileInfo.get("Reason", "")))
+else:
+  from DIRAC.DataManagementSystem.Client.DataManager import DataManager
+  dm = DataManager()
+  for lfn in lfns:
+    start = time.time()
+    res = dm.replicateAndRegister(lfn, dstSE, srcSE)
+    end = time.time()
+    if not res["OK"]:
+      report(lfn, res["Message"])
+    elif lfn not in res["Value"]["Successful"]:
+      report(lfn, res["Value"]["Failed"].get(lfn, "unknown error"))
+    else:
+      report(lfn, "", start, end)
+
+DIRAC.exit(0)
@@ -4,18 +4,40 @@ import DIRAC
 from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
+Script.setUsageMessage("""
+retransfer the finished or killed files.
+Usage:
+  %s <fileid> [<fileid> ...]
+  %s -r <ReqID> [-a]
+""" % (Script.scriptName, Script.scriptName))
+
+Script.registerSwitch("r:", "request=", "retransfer the files of a request")
+Script.registerSwitch("a", "all", "with -r, also the files finished without error")
 Script.parseCommandLine( ignoreErrors = True )
 args = Script.getPositionalArgs()
 
-if (len(args)==0):
+reqid = None
+failedOnly = True
+for k, v in Script.getUnprocessedSwitches():
+  if k in ('r', 'request'):
+    reqid = int(v)
+  if k in ('a', 'all'):
+    failedOnly = False
+
+if (len(args)==0 and reqid is None):
   gLogger.error("Please give the file id you want to retransfer")
+  DIRAC.exit(-1)
 
 from DIRAC.Core.DISET.RPCClient import RPCClient
 
 transferRequest = RPCClient("Transfer/TransferRequest")
 
-for transid in args:
-  condDict = {"id": int(transid)}
-  res = transferRequest.retransfer(condDict)
-  print res
-
+if reqid is None:
+  # the files given explicitly are requeued whatever their error
+  res = transferRequest.requeue({"id": [int(transid) for transid in args]}, False)
+else:
+  res = transferRequest.requeue({"trans_req_id": reqid}, failedOnly)
+if not res["OK"]:
+  gLogger.error(res["Message"])
+  DIRAC.exit(-1)
+print "%d files are retransferred." % res["Value"]
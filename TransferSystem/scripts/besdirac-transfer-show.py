@@ -4,9 +4,29 @@ import DIRAC
 from DIRAC import gLogger
 from DIRAC.Core.Base import Script
 
+Script.setUsageMessage("""
+show the files of transfer requests, page by page.
+Usage:
+  %s <ReqID> [<ReqID> ...] [-s <status>] [-e]
+""" % Script.scriptName)
+
+Script.registerSwitch("s:", "status=", "only the files of the status, e.g. kill,finish")
+Script.registerSwitch("e", "error", "show the error text")
+Script.registerSwitch("n:", "page=", "files in one page, default 1000")
 Script.parseCommandLine( ignoreErrors = True )
 args = Script.getPositionalArgs()
 
+statuses = None
+withError = False
+pageSize = 1000
+for k, v in Script.getUnprocessedSwitches():
+  if k in ('s', 'status'):
+    statuses = v.split(",")
+  if k in ('e', 'error'):
+    withError = True
+  if k in ('n', 'page'):
+    pageSize = int(v)
+
 if (len(args)==0):
   gLogger.error("Please give the request id")
 
@@ -16,8 +36,19 @@ transferRequest = RPCClient("Transfer/TransferRequest")
 
 for transid in args:
   condDict = {"trans_req_id": int(transid)}
-  res = transferRequest.show(condDict)
-  if res["OK"]:
+  if statuses:
+    condDict["status"] = statuses
+  lastId = 0
+  while True:
+    res = transferRequest.showlimit(condDict, None, pageSize, lastId, withError)
+    if not res["OK"]:
+      gLogger.error(res["Message"])
+      break
+    # the service may send less than pageSize files (MAX_SHOW_LIMIT),
+    # so only an empty page is the end
+    if not res["Value"]:
+      break
     for line in res["Value"]:
       print line
+    lastId = res["Value"][-1][0]
 
@@ -30,32 +30,32 @@ class TransferAppHandler(WebHandler):
         transferRequest = RPCClient("Transfer/Dataset")
         condDict = {}
         orderby = []
-        start = 0
-        limit = 50
-        res = transferRequest.showtotal(condDict)
-        #self.log.always(res)
-        #  {'OK': True, 'rpcStub': (('Transfer/Dataset', {'skipCACheck': False, 'keepAliveLapse': 150, 'delegatedGroup': 'bes_user', 'delegatedDN': '/C=CN/O=HEP/OU=PHYS/O=IHEP/CN=Tian Yan', 'timeout': 600}), 'showtotal', ({},)), 'Value': 68L} 
-        limit = res["Value"]
-
-        res = transferRequest.show(condDict, orderby, start, limit)
+        # one page of the grid, with the number of files of each dataset
+        start = int(self.request.arguments.get("start", [0])[0])
+        limit = int(self.request.arguments.get("limit", [50])[0])
+        res = transferRequest.summary(condDict, orderby, start, limit)
         #self.log.always(res)
         # {'OK': True, 
-        #  'rpcStub': (('Transfer/Dataset', {'delegatedDN': '/C=CN/O=HEP/OU=PHYS/O=IHEP/CN=Tian Yan', 'timeout': 600, 'skipCACheck': False, 'keepAliveLapse': 150, 'delegatedGroup': 'bes_user'}), 'show', ({}, [], 0, 68L)), 
-        #  'Value': (
-        #            (1L, 'my-dataset', 'lintao'), 
-        #            (2L, 'jpsi-test', 'besdirac02.ihep.ac.cn'), 
-        #            (3L, 'jpsi-test-10', 'besdirac02.ihep.ac.cn'), 
-        #           )
+        #  'Value': {
+        #    'ParameterNames': ['id', 'name', 'owner', 'files'],
+        #    'Records': (
+        #            (1L, 'my-dataset', 'lintao', 10L), 
+        #            (2L, 'jpsi-test', 'besdirac02.ihep.ac.cn', 100L), 
+        #           ),
+        #    'TotalRecords': 68L}
         # } 
         data = []
+        total = 0
         if res["OK"]:
-            for id, dataset, owner in res["Value"]:
+            total = res["Value"]["TotalRecords"]
+            for id, dataset, owner, files in res["Value"]["Records"]:
                 data.append({
                     "id": id,
                     "owner": owner, 
                     "dataset": dataset,
+                    "files": files,
                 })
-        self.write({"result": data})
+        self.write({"result": data, "total": total})
     def web_datasetListFiles(self):
         self.log.debug(self.request.arguments)
         dataset = None
@@ -63,16 +63,22 @@ class TransferAppHandler(WebHandler):
             dataset = self.request.arguments["dataset"][0]
         data = []
         cache = []
+        total = 0
         if dataset:
+            # one page of the grid
+            start = int(self.request.arguments.get("start", [0])[0])
+            limit = int(self.request.arguments.get("limit", [100])[0])
             RPC = RPCClient("Transfer/Dataset")
-            res = RPC.list(dataset)
+            res = RPC.listtotal(dataset)
+            if res["OK"]:
+                total = res["Value"]
+            res = RPC.listlimit(dataset, start, limit, None)
             #self.log.always(res)
             # {'OK': True, 
-            #  'rpcStub': (('Transfer/Dataset', {'skipCACheck': False, 'keepAliveLapse': 150, 'delega tedGroup': 'bes_user', 'delegatedDN': '/C=CN/O=HEP/OU=PHYS/O=IHEP/CN=Tian Yan', 'timeout': 600}), 'list', ('jpsi-all-ok',)), 
-            #  'Value': [
+            #  'Value': (
             #   (176L, '/zhanggang_test/File/jpsi/6.6.4/mc/inclusive/round02/stream001/jpsi2009_stream001_run10005_file14', 7L), 
             #   (177L, '/zhanggang_test/File/jpsi/6.6.4/mc/inclusive /round02/stream001/jpsi2009_stream001_run10137_file7', 7L), 
-            #  ]
+            #  )
             # }
             if res["OK"]:
                 cache = res["Value"]
@@ -83,7 +89,7 @@ class TransferAppHandler(WebHandler):
                 "id": i,
                 "file": f,
             })
-        self.write({"result": data})
+        self.write({"result": data, "total": total})
     # == create ==
     # == delete ==
 
@@ -177,7 +183,9 @@ class TransferAppHandler(WebHandler):
         #  'WHU-USER', 
         #  'DIRACDMS', 
         #  datetime.datetime(2015, 6, 12, 8, 41, 19), 
-        #  'finish'),
+        #  'finish',
+        #  0,
+        #  1),
 
         for vv in cache:
             data.append({
@@ -189,6 +197,8 @@ class TransferAppHandler(WebHandler):
                 "protocol": vv[5], 
                 "submitTime": vv[6].strftime("%Y-%m-%d %H:%M [UTC]") if vv[6] else "",
                 "status": vv[7],
+                "priority": vv[8],
+                "weight": vv[9],
             })
         self.write({"result": data})
 
@@ -213,14 +223,24 @@ class TransferAppHandler(WebHandler):
         if build_input_param["dstse"] == build_input_param["srcse"]:
             raise WErr( 400, "dstse and srcse are same" )
         ## protocol
-        if build_input_param["protocol"] not in ["DIRACDMS", "DIRACFTS"]:
+        if build_input_param["protocol"] not in ["DIRACDMS", "DIRACFTS", "GFAL2"]:
             raise WErr( 400, "protocol %s is wrong"%build_input_param["protocol"] )
+        ## priority and weight, optional
+        try:
+            priority = int(self.request.arguments.get("priority", [0])[0])
+            weight = int(self.request.arguments.get("weight", [1])[0])
+        except ValueError:
+            raise WErr( 400, "priority and weight should be integers" )
+        if weight < 1:
+            raise WErr( 400, "weight should be at least 1" )
         # create
         RPC = RPCClient("Transfer/TransferRequest")
         res = RPC.create(build_input_param["dataset"],
                          build_input_param["srcse"],
                          build_input_param["dstse"],
-                         build_input_param["protocol"])
+                         build_input_param["protocol"],
+                         priority,
+                         weight)
         # TODO how to return error to the user?
         if not res["OK"]:
             self.log.error(res)
@@ -234,11 +254,21 @@ class TransferAppHandler(WebHandler):
     def web_requestListFiles(self):
         self.log.debug(self.request.arguments)
         cache = []
+        total = 0
         if self.request.arguments.get("reqid", None):
             reqid = int(self.request.arguments["reqid"][0])
+            # one page of the grid, the error text is loaded by requestFileError
+            start = int(self.request.arguments.get("start", [0])[0])
+            limit = int(self.request.arguments.get("limit", [100])[0])
             RPC = RPCClient("Transfer/TransferRequest")
             cond = {"trans_req_id": reqid}
-            res = RPC.show(cond)
+            status = self.request.arguments.get("status", [""])[0]
+            if status:
+                cond["status"] = status.split(",")
+            res = RPC.showtotal(cond)
+            if res["OK"]:
+                total = res["Value"]
+            res = RPC.showlimit(cond, start, limit, None, False)
             if res["OK"]:
                 cache = res["Value"]
         #self.log.always(cache)
@@ -248,7 +278,7 @@ class TransferAppHandler(WebHandler):
         #  datetime.datetime(2013, 8, 23, 3, 12, 37), 
         #  datetime.datetime(2013, 8, 23, 3, 14, 37), 
         #  'finish', 
-        #  'error'
+        #  'error' # only a flag, "error" or ""
         # )
         data = []
         for vv in cache:
@@ -260,6 +290,17 @@ class TransferAppHandler(WebHandler):
                 "status": vv[5],
                 "error": vv[6],
             })
-        self.write({"result": data})
+        self.write({"result": data, "total": total})
+
+    # == error of one file ==
+    def web_requestFileError(self):
+        error = ""
+        if self.request.arguments.get("fileid", None):
+            fileid = int(self.request.arguments["fileid"][0])
+            RPC = RPCClient("Transfer/TransferRequest")
+            res = RPC.show({"id": fileid})
+            if res["OK"] and res["Value"]:
+                error = res["Value"][0][6]
+        self.write({"result": error})
 
 
@@ -181,6 +181,14 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     name: 'status',
                     type: 'string',
                 },
+                {
+                    name: 'priority',
+                    type: 'int',
+                },
+                {
+                    name: 'weight',
+                    type: 'int',
+                },
             ],
             listeners: {
                 load : function(oStore, records, successful, eOpts) {
@@ -246,6 +254,14 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     text: "status",
                     dataIndex: "status",
                 },
+                {
+                    text: "priority",
+                    dataIndex: "priority",
+                },
+                {
+                    text: "weight",
+                    dataIndex: "weight",
+                },
             ],
 
             title: "Requests list",
@@ -279,10 +295,9 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                             console.log(reqid);
                             // after get the datasetid, 
                             // we need to show them in files list.
-                            me.datastore_files_in_request.load({
-                                params: {
-                                    reqid: reqid,
-                                },
+                            // keep the request id for the next pages
+                            me.datastore_files_in_request.getProxy().extraParams.reqid = reqid;
+                            me.datastore_files_in_request.loadPage(1, {
                                 callback: function(records, operation, success) {
                                     // do something after the load finishes
                                     if (success) {
@@ -314,12 +329,16 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
         var me = this;
         console.log(me);
         me.datastore_files_in_request = new Ext.data.JsonStore({
+            // the files are loaded page by page, without the error text
+            pageSize : 100,
+            remoteFilter : true,
             proxy : {
                 type : 'ajax',
                 url : GLOBAL.BASE_URL + 'TransferApp/requestListFiles',
                 reader : {
                   type : 'json',
-                  root : 'result'
+                  root : 'result',
+                  totalProperty : 'total'
                 },
                 method : 'POST',
                 timeout : 1800000
@@ -429,30 +448,59 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     handler: me.refresh_requests_file_list,
                     },
                     {
+                    xtype: 'combo',
+                    fieldLabel: 'status',
+                    labelWidth: 40,
+                    store: ["", "new", "transfer", "finish", "kill"],
+                    queryMode: 'local',
+                    value: '',
+                    listeners: {
+                        select: function(combo) {
+                            me.datastore_files_in_request.getProxy().extraParams.status = combo.getValue();
+                            me.datastore_files_in_request.loadPage(1);
+                        },
+                    },
+                    },
+                    {
                     xtype: "button",
                     text: "show error",
                     handler: function() {
                         var selectedRows = me.panel_files_in_request.getSelectionModel().getSelection();
                         // console.log(selectedRows);
                         for (var i = 0; i < selectedRows.length; ++i) {
-                            //console.log(selectedRows[i].get("error"));
-                            plain_error = selectedRows[i].get("error");
-                            Ext.create('Ext.window.Window', {
-                                closable: true,
-                                width: 600,
-                                height: 400,
-                                //autoHeight: true,
-                                autoScroll: true,
-                                title: "Error Info",
-                                layout: "fit",
-                                html: "<pre>"+plain_error+"</pre>"
-                            }).show();
+                            // the error text is not in the page, load it for this file
+                            Ext.Ajax.request({
+                                url: GLOBAL.BASE_URL + 'TransferApp/requestFileError',
+                                method: 'POST',
+                                params: {
+                                    fileid: selectedRows[i].get("id"),
+                                },
+                                success: function(response) {
+                                    var plain_error = Ext.JSON.decode(response.responseText)["result"];
+                                    Ext.create('Ext.window.Window', {
+                                        closable: true,
+                                        width: 600,
+                                        height: 400,
+                                        //autoHeight: true,
+                                        autoScroll: true,
+                                        title: "Error Info",
+                                        layout: "fit",
+                                        html: "<pre>"+Ext.String.htmlEncode(plain_error)+"</pre>"
+                                    }).show();
+                                },
+                            });
                         }
 
                     }
                     },
                 ],
                 },
+                {
+                xtype: "pagingtoolbar",
+                store: me.datastore_files_in_request,
+                dock: "bottom",
+                displayInfo: true,
+                },
             ],
         });
     },
@@ -493,11 +541,26 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                 xtype: 'combo',
                 fieldLabel: 'Protocol',
                 name: 'protocol',
-                store: ["DIRACDMS", "DIRACFTS"],
+                store: ["DIRACDMS", "DIRACFTS", "GFAL2"],
                 forceSelect: true,
                 queryMode: 'local',
                 value: 'DIRACDMS',
                 allowBlank: false
+            },{
+                xtype: 'numberfield',
+                fieldLabel: 'Priority',
+                name: 'priority',
+                value: 0,
+                allowDecimals: false,
+                allowBlank: false
+            },{
+                xtype: 'numberfield',
+                fieldLabel: 'Weight',
+                name: 'weight',
+                value: 1,
+                minValue: 1,
+                allowDecimals: false,
+                allowBlank: false
             }],
         
             // Reset and Submit buttons
@@ -598,13 +661,16 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
         var me = this;
         console.log(me);
         me.datastore_dataset_list = new Ext.data.JsonStore({
+            // the datasets are loaded page by page
+            pageSize : 50,
             proxy : {
                 type : 'ajax',
                 method : 'POST',
                 url : GLOBAL.BASE_URL + 'TransferApp/datasetList',
                 reader : {
                   type : 'json',
-                  root : 'result'
+                  root : 'result',
+                  totalProperty : 'total'
                 },
                 timeout : 1800000
             },
@@ -622,6 +688,10 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     name: 'dataset',
                     type: 'string',
                 },
+                {
+                    name: 'files',
+                    type: 'int',
+                },
             ],
             listeners: {
                 load : function(oStore, records, successful, eOpts) {
@@ -669,6 +739,10 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     text: "owner",
                     dataIndex: "owner",
                 },
+                {
+                    text: "files",
+                    dataIndex: "files",
+                },
             ],
             title: "Datasets list",
             dockedItems: [
@@ -691,10 +765,9 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                             console.log(datasetid);
                             // after get the datasetid, 
                             // we need to show them in files list.
-                            me.datastore_files_in_dataset.load({
-                                params: {
-                                    dataset: datasetid,
-                                },
+                            // keep the dataset for the next pages
+                            me.datastore_files_in_dataset.getProxy().extraParams.dataset = datasetid;
+                            me.datastore_files_in_dataset.loadPage(1, {
                                 callback: function(records, operation, success) {
                                     // do something after the load finishes
                                     if (success) {
@@ -723,6 +796,12 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                 }
                 ],
                 },
+                {
+                xtype: "pagingtoolbar",
+                store: me.datastore_dataset_list,
+                dock: "bottom",
+                displayInfo: true,
+                },
             ],
         });
     },
@@ -731,12 +810,15 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
         var me = this;
         console.log(me);
         me.datastore_files_in_dataset = new Ext.data.JsonStore({
+            // the files are loaded page by page
+            pageSize : 100,
             proxy : {
                 type : 'ajax',
                 url : GLOBAL.BASE_URL + 'TransferApp/datasetListFiles',
                 reader : {
                   type : 'json',
-                  root : 'result'
+                  root : 'result',
+                  totalProperty : 'total'
                 },
                 method : 'POST',
                 timeout : 1800000
@@ -800,6 +882,14 @@ Ext.define('IHEPDIRAC.TransferApp.classes.TransferApp', {
                     text: "refresh",
                 },
             ],
+            dockedItems: [
+                {
+                xtype: "pagingtoolbar",
+                store: me.datastore_files_in_dataset,
+                dock: "bottom",
+                displayInfo: true,
+                },
+            ],
         });
     },
     // === dataset: view request ===